@@ -0,0 +1,89 @@
+from django.db import IntegrityError, transaction
+
+from recipes.counters import delete_counted, increment_counters
+from recipes.models import ShoppingCart
+from recipes.shopping_totals import add_to_shopping_totals
+from recipes.trending import TRENDING_WEIGHTS, add_trending_events
+from .constants import (
+    BULK_CREATE_RETRIES,
+    BULK_STATUS_NOT_FOUND,
+    UNIQUE_VIOLATION_SQLSTATE,
+)
+
+
+def is_unique_violation(error):
+    """
+    Вызвана ли ошибка нарушением уникальности, а не внешним ключом
+    или другим ограничением
+    """
+    cause = error.__cause__
+    code = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    if code is not None:
+        return code == UNIQUE_VIOLATION_SQLSTATE
+    return "UNIQUE constraint failed" in str(error)
+
+
+def add_relations(model, user, field, target_ids):
+    """
+    Создает недостающие связи пользователя с объектами target_ids
+    одним INSERT. Возвращает множество id, связи с которыми
+    созданы этим вызовом. Вызывается внутри транзакции.
+    Нарушение уникальности повторяется не больше BULK_CREATE_RETRIES раз,
+    остальные ошибки целостности пробрасываются сразу
+    """
+    for attempt in range(BULK_CREATE_RETRIES + 1):
+        present = set(model.objects.filter(
+            user=user, **{f"{field}__in": target_ids}
+        ).values_list(field, flat=True))
+        missing = [pk for pk in target_ids if pk not in present]
+        try:
+            with transaction.atomic():
+                created = model.objects.bulk_create(
+                    model(user=user, **{f"{field}_id": pk}) for pk in missing
+                )
+                # bulk_create не отправляет сигналы
+                increment_counters(model, missing)
+                if model in TRENDING_WEIGHTS:
+                    add_trending_events(model, (
+                        (getattr(relation, f"{field}_id"), relation.created_at)
+                        for relation in created
+                    ))
+                if model is ShoppingCart:
+                    add_to_shopping_totals(user.pk, missing)
+        except IntegrityError as error:
+            if attempt == BULK_CREATE_RETRIES or not is_unique_violation(
+                error
+            ):
+                raise
+            # Параллельный запрос успел создать часть связей,
+            # на следующей итерации они попадут в present
+            continue
+        return set(missing)
+
+
+def remove_relations(model, user, field, target_ids):
+    """
+    Удаляет существующие связи пользователя с объектами target_ids.
+    Возвращает множество id, связи с которыми удалены этим вызовом.
+    Вызывается внутри транзакции
+    """
+    return set(delete_counted(model.objects.filter(
+        user=user, **{f"{field}__in": target_ids}
+    )).values())
+
+
+def get_bulk_results(ids, changed, found, changed_status, unchanged_status):
+    """
+    Результат для каждого переданного id в исходном порядке
+    """
+    return [
+        {
+            "id": pk,
+            "status": (
+                changed_status if pk in changed
+                else unchanged_status if pk in found
+                else BULK_STATUS_NOT_FOUND
+            ),
+        }
+        for pk in ids
+    ]
@@ -0,0 +1,218 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from recipes.ingredient_index import ingredient_index
+from .constants import (
+    RECIPES_CATALOG_VERSION_CACHE_KEY,
+    RECIPES_COUNTERS_PENDING_CACHE_KEY,
+    RECIPES_COUNTERS_STALE_TIMEOUT,
+    RECIPES_COUNTERS_THROTTLE_CACHE_KEY,
+    RECIPES_COUNTERS_VERSION_CACHE_KEY,
+    RECIPES_RESPONSE_CACHE_PREFIX,
+    RECIPES_RESPONSE_CACHE_TIMEOUT,
+    USER_RELATIONS_VERSION_CACHE_KEY,
+)
+
+
+def is_cache_shared():
+    """
+    Видят ли записи кэша другие процессы: кэш в памяти процесса
+    и пустой кэш изменения из команд управления не передают
+    """
+    return not isinstance(
+        caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)
+    )
+
+
+def get_version(key):
+    """
+    Текущая версия данных по ключу.
+    Версия — время последнего изменения в микросекундах
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Меняет версию данных по ключу
+    """
+    version = max(time.time_ns() // 1000, get_version(key) + 1)
+    cache.set(key, version, timeout=None)
+
+
+def get_catalog_version():
+    """
+    Версия каталога рецептов и публичных данных пользователей
+    """
+    return get_version(RECIPES_CATALOG_VERSION_CACHE_KEY)
+
+
+def bump_catalog_version():
+    """
+    Меняет версию каталога рецептов,
+    из-за чего все закэшированные ответы перестают использоваться
+    """
+    bump_version(RECIPES_CATALOG_VERSION_CACHE_KEY)
+
+
+def get_user_relations_version(user_id):
+    """
+    Версия избранного, списка покупок и подписок пользователя
+    """
+    return get_version(
+        USER_RELATIONS_VERSION_CACHE_KEY.format(user_id=user_id)
+    )
+
+
+def bump_user_relations_version(user_id):
+    """
+    Меняет версию избранного, списка покупок и подписок пользователя
+    """
+    bump_version(USER_RELATIONS_VERSION_CACHE_KEY.format(user_id=user_id))
+
+
+def get_counters_version():
+    """
+    Версия счетчиков избранного, списков покупок и подписчиков
+    и сортировок по популярности. Отложенное изменение применяется
+    при первом чтении, если версия не менялась последние
+    RECIPES_COUNTERS_STALE_TIMEOUT секунд, поэтому частые добавления
+    в избранное не сбрасывают закэшированные ответы постоянно,
+    а счетчики в них отстают не больше чем на этот интервал
+    """
+    if cache.get(RECIPES_COUNTERS_PENDING_CACHE_KEY) and cache.add(
+        RECIPES_COUNTERS_THROTTLE_CACHE_KEY,
+        True,
+        timeout=RECIPES_COUNTERS_STALE_TIMEOUT,
+    ):
+        # Изменения после удаления отметки учтет новая версия
+        cache.delete(RECIPES_COUNTERS_PENDING_CACHE_KEY)
+        bump_version(RECIPES_COUNTERS_VERSION_CACHE_KEY)
+    return get_version(RECIPES_COUNTERS_VERSION_CACHE_KEY)
+
+
+def bump_counters_version():
+    """
+    Отмечает изменение счетчиков, версия сменится при чтении
+    """
+    cache.set(RECIPES_COUNTERS_PENDING_CACHE_KEY, True, timeout=None)
+
+
+def bump_relations_versions(user_id):
+    """
+    Меняет версию связей пользователя сразу,
+    а версию счетчиков — с ограничением частоты
+    """
+    bump_user_relations_version(user_id)
+    bump_counters_version()
+
+
+def get_request_fingerprint(request):
+    """
+    Хост (ссылки на изображения абсолютные), путь
+    и отсортированные параметры запроса
+    """
+    query = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+    return f"{request.get_host()}|{request.path}|{query}"
+
+
+def get_response_cache_key(request):
+    """
+    Ключ кэша ответа: версии каталога и счетчиков и отпечаток запроса
+    """
+    digest = hashlib.md5(
+        get_request_fingerprint(request).encode()
+    ).hexdigest()
+    return (
+        f"{RECIPES_RESPONSE_CACHE_PREFIX}:{get_catalog_version()}:"
+        f"{get_counters_version()}:{digest}"
+    )
+
+
+def cache_anonymous_response(view_method):
+    """
+    Кэширует данные ответа для анонимных пользователей:
+    для них ответ не зависит от пользователя
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        key = get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RECIPES_RESPONSE_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def get_catalog_validators(request):
+    """
+    ETag и время изменения ответа, построенного из каталога рецептов
+    и связей текущего пользователя. Не требуют запросов к базе
+    """
+    versions = [get_catalog_version(), get_counters_version()]
+    if request.user.is_authenticated:
+        versions.append(get_user_relations_version(request.user.pk))
+    etag = hashlib.md5(
+        f"{request.user.pk}|{versions}|"
+        f"{get_request_fingerprint(request)}".encode()
+    ).hexdigest()
+    return etag, max(versions) // 10 ** 6
+
+
+def get_ingredients_validators(request):
+    """
+    ETag ответа из каталога ингредиентов по содержимому индекса
+    """
+    etag = hashlib.md5(
+        f"{ingredient_index.digest()}|"
+        f"{get_request_fingerprint(request)}".encode()
+    ).hexdigest()
+    return etag, ingredient_index.version() // 10 ** 6
+
+
+def conditional_response(get_validators):
+    """
+    Условный GET: отдает 304 по If-None-Match / If-Modified-Since
+    до выполнения view и сериализаторов
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = get_validators(request)
+            response = get_conditional_response(
+                request, etag=quote_etag(etag), last_modified=last_modified
+            )
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response["ETag"] = quote_etag(etag)
+            response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ("Authorization",))
+            return response
+        return wrapper
+    return decorator
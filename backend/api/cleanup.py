@@ -0,0 +1,153 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from recipes.counters import COUNTERS, delete_counted
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+from .constants import CLEANUP_BATCH_SIZE, GC_MEDIA_MIN_AGE
+from .images import is_image_recent, release_image
+from .models import CleanupTask
+
+logger = logging.getLogger(__name__)
+
+# Один фоновый поток разбирает очередь задач очистки по порядку
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+# Таймер запуска отложенных задач, меняется только из потока очистки
+delayed_run = None
+
+
+def enqueue_files(names):
+    """
+    Ставит файлы в очередь на удаление.
+    Файл удаляется, только если на него больше никто не ссылается
+    """
+    tasks = [
+        CleanupTask(kind=CleanupTask.FILE, target=name)
+        for name in names
+        if name
+    ]
+    if tasks:
+        CleanupTask.objects.bulk_create(tasks, ignore_conflicts=True)
+        transaction.on_commit(schedule_cleanup)
+
+
+def enqueue_user(user_id):
+    """
+    Ставит пользователя и все его данные в очередь на удаление
+    """
+    CleanupTask.objects.get_or_create(
+        kind=CleanupTask.USER, target=str(user_id)
+    )
+    transaction.on_commit(schedule_cleanup)
+
+
+def schedule_cleanup():
+    executor.submit(run_cleanup)
+
+
+def schedule_delayed_cleanup():
+    """
+    Запускает разбор очереди, когда подойдет срок ближайшей
+    отложенной задачи. После перезапуска процесса отложенные задачи
+    выполнит следующий разбор очереди или gc_media
+    """
+    global delayed_run
+    next_run = CleanupTask.objects.aggregate(
+        next_run=Min("run_after")
+    )["next_run"]
+    if delayed_run is not None:
+        delayed_run.cancel()
+        delayed_run = None
+    if next_run is None:
+        return
+    delayed_run = threading.Timer(
+        max((next_run - timezone.now()).total_seconds(), 0),
+        schedule_cleanup,
+    )
+    # Таймер не должен задерживать завершение процесса
+    delayed_run.daemon = True
+    delayed_run.start()
+
+
+def run_cleanup():
+    try:
+        drain_cleanup_queue()
+        schedule_delayed_cleanup()
+    except Exception:
+        logger.exception("Не удалось разобрать очередь очистки")
+    finally:
+        # Соединения фонового потока не закрываются обработчиком запросов
+        connections.close_all()
+
+
+def delete_in_batches(queryset, batch_size=CLEANUP_BATCH_SIZE):
+    """
+    Удаляет записи пачками, каждую в своей транзакции,
+    чтобы не держать блокировки и все связанные объекты в памяти
+    """
+    model = queryset.model
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        with transaction.atomic():
+            batch = model.objects.filter(pk__in=ids)
+            if model in COUNTERS:
+                delete_counted(batch)
+            else:
+                batch.delete()
+
+
+def delete_user(user_id):
+    """
+    Удаляет пользователя: сначала пачками его рецепты и связи,
+    затем саму запись с оставшимся небольшим каскадом
+    """
+    delete_in_batches(Recipe.objects.filter(author=user_id))
+    delete_in_batches(Favorite.objects.filter(user=user_id))
+    delete_in_batches(ShoppingCart.objects.filter(user=user_id))
+    delete_in_batches(
+        Subscription.objects.filter(Q(user=user_id) | Q(author=user_id))
+    )
+    with transaction.atomic():
+        User.objects.filter(pk=user_id).delete()
+
+
+def drain_cleanup_queue(min_age=GC_MEDIA_MIN_AGE):
+    """
+    Выполняет задачи очистки, срок которых подошел, пока такие
+    не закончатся. Задачи для файлов моложе min_age секунд
+    откладываются на min_age секунд, а не удаляются.
+    Возвращает количество освобожденных байт
+    """
+    reclaimed = 0
+    while True:
+        now = timezone.now()
+        tasks = list(
+            CleanupTask.objects.filter(run_after__lte=now)[
+                :CLEANUP_BATCH_SIZE
+            ]
+        )
+        if not tasks:
+            return reclaimed
+        postponed = []
+        for task in tasks:
+            if task.kind == CleanupTask.USER:
+                # Удаление рецептов ставит их изображения в очередь
+                delete_user(int(task.target))
+            elif is_image_recent(task.target, min_age):
+                postponed.append(task.pk)
+            else:
+                reclaimed += release_image(task.target, min_age)
+        CleanupTask.objects.filter(pk__in=postponed).update(
+            run_after=now + timedelta(seconds=min_age)
+        )
+        CleanupTask.objects.filter(
+            pk__in=[task.pk for task in tasks if task.pk not in postponed]
+        ).delete()
@@ -1,11 +1,67 @@
 PAGINATION_PAGE_SIZE = 6
 PAGINATION_PAGE_SIZE_QUERY_PARAM = "limit"
 PAGINATION_MAX_PAGE_SIZE = 100
+PAGINATION_CURSOR_QUERY_PARAM = "cursor"
 
 ACTION_TYPE_ADD = "add"
 ACTION_TYPE_REMOVE = "remove"
 
 RECIPES_LIMIT_QUERY_PARAM = "recipes_limit"
+SHOPPING_CART_BREAKDOWN_QUERY_PARAM = "breakdown"
+SHOPPING_CART_EXPORT_CHUNK_SIZE = 2000
+SHOPPING_CART_FILENAME = "purchased_cart"
+
+RECIPES_CATALOG_VERSION_CACHE_KEY = "recipes:catalog_version"
+USER_RELATIONS_VERSION_CACHE_KEY = "users:{user_id}:relations_version"
+# Версия счетчиков и сортировок по популярности меняется не чаще,
+# чем раз в RECIPES_COUNTERS_STALE_TIMEOUT секунд
+RECIPES_COUNTERS_VERSION_CACHE_KEY = "recipes:counters_version"
+RECIPES_COUNTERS_PENDING_CACHE_KEY = "recipes:counters_pending"
+RECIPES_COUNTERS_THROTTLE_CACHE_KEY = "recipes:counters_throttle"
+RECIPES_COUNTERS_STALE_TIMEOUT = 60
+RECIPES_RESPONSE_CACHE_PREFIX = "recipes:response"
+RECIPES_RESPONSE_CACHE_TIMEOUT = 60 * 10
+RECIPES_CACHE_WARM_PAGES = 5
+
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_DIMENSION = 6000
+IMAGE_VARIANTS = {
+    "thumbnail": 200,
+    "medium": 600,
+}
+IMAGE_VARIANTS_DIR = "variants"
+IMAGE_VARIANTS_QUALITY = 80
+IMAGE_WORKERS = 2
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+RECIPES_TRANSFER_FILE = "recipes.ndjson"
+RECIPES_TRANSFER_IMAGES_DIR = "images"
+RECIPES_EXPORT_CHUNK_SIZE = 1000
+RECIPES_IMPORT_BATCH_SIZE = 500
+
+CLEANUP_KIND_MAX_LENGTH = 16
+CLEANUP_TARGET_MAX_LENGTH = 255
+CLEANUP_BATCH_SIZE = 200
+GC_MEDIA_MIN_AGE = 60 * 60
+GC_MEDIA_BATCH_SIZE = 1000
+
+BULK_IDS_MAX_LENGTH = 100
+# Повторы вставки связей после гонки с параллельным запросом
+BULK_CREATE_RETRIES = 2
+# SQLSTATE нарушения уникальности в PostgreSQL
+UNIQUE_VIOLATION_SQLSTATE = "23505"
+# Аннотации поиска, которые попадают в ответ со списком рецептов
+SEARCH_RESULT_FIELDS = (
+    "search_snippet",
+    "ingredients_matched",
+    "ingredients_missing",
+)
+BULK_STATUS_ADDED = "added"
+BULK_STATUS_REMOVED = "removed"
+BULK_STATUS_ALREADY_ADDED = "already_added"
+BULK_STATUS_NOT_ADDED = "not_added"
+BULK_STATUS_NOT_FOUND = "not_found"
+BULK_STATUS_SELF = "self"
 
 ERROR_RECIPE_ALREADY_ADDED = "Рецепт уже добавлен"
 ERROR_RECIPE_NOT_FOUND = "Рецепт не найден"
@@ -13,3 +69,11 @@ ERROR_SELF_SUBSCRIBE = "Невозможно подписаться/отписа
 ERROR_ALREADY_SUBSCRIBED = "Подписка уже оформлена"
 ERROR_NOT_SUBSCRIBED = "Вы уже отписаны"
 ERROR_AVATAR_EMPTY = "Аватар не может быть пустым"
+ERROR_INVALID_CURSOR = "Неверный курсор"
+ERROR_TOO_MANY_INGREDIENTS = (
+    "Можно указать не больше {max_count} ингредиентов"
+)
+ERROR_IMAGE_TOO_LARGE = "Размер изображения не может превышать {max_size} Мб"
+ERROR_IMAGE_TOO_BIG = (
+    "Ширина и высота изображения не могут превышать {max_dimension} пикселей"
+)
@@ -0,0 +1,82 @@
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+from .constants import (
+    ERROR_IMAGE_TOO_BIG,
+    ERROR_IMAGE_TOO_LARGE,
+    IMAGE_MAX_DIMENSION,
+    IMAGE_MAX_SIZE,
+    IMAGE_VARIANTS,
+)
+from .images import get_variant_url
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    """
+    Base64ImageField с ограничением размера файла и изображения.
+    Кроме строки base64 принимает файл из multipart/form-data.
+    Размер файла проверяется по длине строки до декодирования,
+    размеры изображения — по заголовку файла
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            # Файл уже получен потоком и лежит на диске или в памяти,
+            # проверяем его как обычный ImageField
+            image_file = super(Base64FieldMixin, self).to_internal_value(data)
+            self.validate_image_file(image_file)
+            return image_file
+        if isinstance(data, str) and len(data) * 3 // 4 > IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(self.get_size_error())
+        image_file = super().to_internal_value(data)
+        if image_file is not None:
+            self.validate_image_file(image_file)
+        return image_file
+
+    def validate_image_file(self, image_file):
+        if image_file.size > IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(self.get_size_error())
+        image_file.seek(0)
+        width, height = Image.open(image_file).size
+        image_file.seek(0)
+        if max(width, height) > IMAGE_MAX_DIMENSION:
+            raise serializers.ValidationError(ERROR_IMAGE_TOO_BIG.format(
+                max_dimension=IMAGE_MAX_DIMENSION
+            ))
+
+    def get_size_error(self):
+        return ERROR_IMAGE_TOO_LARGE.format(
+            max_size=IMAGE_MAX_SIZE // (1024 * 1024)
+        )
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Ссылки на уменьшенные копии изображения.
+    Готовность копий читается из поля модели ready_source,
+    поэтому ответ собирается без обращений к хранилищу
+    """
+    def __init__(self, ready_source, **kwargs):
+        kwargs["read_only"] = True
+        self.ready_source = ready_source
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return (
+            super().get_attribute(instance),
+            getattr(instance, self.ready_source),
+        )
+
+    def to_representation(self, value):
+        field_file, ready = value
+        if not field_file:
+            return None
+        request = self.context.get("request")
+        variants = {}
+        for variant in IMAGE_VARIANTS:
+            url = get_variant_url(field_file, variant, ready)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants[variant] = url
+        return variants
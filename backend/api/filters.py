@@ -1,6 +1,25 @@
+from django import forms
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe
+from recipes.constants import (
+    INGREDIENTS_MATCH_BEST,
+    INGREDIENTS_MATCH_CHOICES,
+    INGREDIENTS_MATCH_MAX_IDS,
+    RECIPES_ORDERING_CHOICES,
+)
+from recipes.ingredient_match import match_ingredients
+from recipes.models import Recipe
+from recipes.search import search_recipes
+from recipes.trending import order_recipes
+from .constants import ERROR_TOO_MANY_INGREDIENTS
+
+
+class IntegerInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """
+    Фильтр по списку целых чисел через запятую
+    """
+    field_class = forms.IntegerField
 
 
 class RecipeFilter(FilterSet):
@@ -9,6 +28,16 @@ class RecipeFilter(FilterSet):
     """
     is_favorited = filters.BooleanFilter(method="favorited")
     is_in_shopping_cart = filters.BooleanFilter(method="in_shopping_cart")
+    search = filters.CharFilter(method="search_text")
+    ingredients = IntegerInFilter(method="with_ingredients")
+    match = filters.ChoiceFilter(
+        choices=INGREDIENTS_MATCH_CHOICES,
+        method="match_mode",
+    )
+    ordering = filters.ChoiceFilter(
+        choices=RECIPES_ORDERING_CHOICES,
+        method="order",
+    )
 
     class Meta:
         model = Recipe
@@ -39,15 +68,36 @@ class RecipeFilter(FilterSet):
             return queryset.none()
         return queryset
 
+    def search_text(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и описанию рецепта,
+        результаты идут в порядке релевантности
+        """
+        return search_recipes(queryset, value)
 
-class IngredientFilter(FilterSet):
-    """
-    Набор фильтров для Ingredient
-    """
-    name = filters.CharFilter(lookup_expr='istartswith')
+    def with_ingredients(self, queryset, name, value):
+        """
+        Подбирает рецепты по набору имеющихся ингредиентов,
+        режим совпадения задает параметр match
+        """
+        if len(value) > INGREDIENTS_MATCH_MAX_IDS:
+            raise ValidationError({
+                name: ERROR_TOO_MANY_INGREDIENTS.format(
+                    max_count=INGREDIENTS_MATCH_MAX_IDS
+                )
+            })
+        mode = self.form.cleaned_data.get("match") or INGREDIENTS_MATCH_BEST
+        return match_ingredients(queryset, value, mode)
 
-    class Meta:
-        model = Ingredient
-        fields = (
-            "name",
-        )
+    def match_mode(self, queryset, name, value):
+        """
+        Режим совпадения учитывается в фильтре ingredients
+        """
+        return queryset
+
+    def order(self, queryset, name, value):
+        """
+        Сортирует рецепты по популярности (popular)
+        или по популярности за последние дни (trending)
+        """
+        return order_recipes(queryset, value)
@@ -0,0 +1,189 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, features
+
+from recipes.models import Recipe
+from users.models import User
+from .cache import bump_catalog_version
+from .constants import (
+    GC_MEDIA_MIN_AGE,
+    IMAGE_VARIANTS,
+    IMAGE_VARIANTS_DIR,
+    IMAGE_VARIANTS_QUALITY,
+    IMAGE_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Пул фоновых потоков для обработки изображений вне запроса
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_WORKERS, thread_name_prefix="image-variants"
+)
+
+# Копии называются по имени оригинала, которое уже содержит хэш,
+# поэтому пишутся в обычное хранилище без переименования
+variant_storage = FileSystemStorage()
+
+if features.check("webp"):
+    VARIANT_FORMAT, VARIANT_EXTENSION = "WEBP", "webp"
+else:
+    VARIANT_FORMAT, VARIANT_EXTENSION = "JPEG", "jpg"
+
+
+def get_variant_name(name, variant):
+    """
+    Имя файла уменьшенной копии изображения:
+    recipes/abc.png -> recipes/variants/abc_thumbnail.webp
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory,
+        IMAGE_VARIANTS_DIR,
+        f"{stem}_{variant}.{VARIANT_EXTENSION}",
+    )
+
+
+def get_variant_url(field_file, variant, ready):
+    """
+    Ссылка на уменьшенную копию или на оригинал,
+    если копии еще не готовы
+    """
+    if ready:
+        return variant_storage.url(
+            get_variant_name(field_file.name, variant)
+        )
+    return field_file.url
+
+
+def generate_variants(name):
+    """
+    Создает недостающие уменьшенные копии изображения.
+    Возвращает True, если были созданы новые копии
+    """
+    missing = {
+        variant: size
+        for variant, size in IMAGE_VARIANTS.items()
+        if not variant_storage.exists(get_variant_name(name, variant))
+    }
+    if not missing:
+        return False
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+    if VARIANT_FORMAT == "JPEG" or image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    for variant, size in missing.items():
+        copy = image.copy()
+        copy.thumbnail((size, size))
+        buffer = io.BytesIO()
+        copy.save(
+            buffer, VARIANT_FORMAT, quality=IMAGE_VARIANTS_QUALITY
+        )
+        variant_storage.save(
+            get_variant_name(name, variant), ContentFile(buffer.getvalue())
+        )
+    return True
+
+
+def mark_variants_ready(name):
+    """
+    Отмечает копии готовыми у всех записей с этим файлом.
+    Возвращает True, если изменилась хотя бы одна запись
+    """
+    recipes = Recipe.objects.filter(
+        image=name, image_variants_ready=False
+    ).update(image_variants_ready=True)
+    users = User.objects.filter(
+        avatar=name, avatar_variants_ready=False
+    ).update(avatar_variants_ready=True)
+    return bool(recipes or users)
+
+
+def run_generate_variants(name):
+    try:
+        generate_variants(name)
+        if mark_variants_ready(name):
+            # Закэшированные ответы ссылаются на оригинал вместо копий
+            bump_catalog_version()
+    except Exception:
+        logger.exception("Не удалось создать копии изображения %s", name)
+
+
+def schedule_variants(name):
+    """
+    Ставит создание копий в очередь фонового пула
+    после фиксации транзакции
+    """
+    if name:
+        transaction.on_commit(
+            lambda: executor.submit(run_generate_variants, name)
+        )
+
+
+def is_image_referenced(name):
+    """
+    Ссылается ли на файл хотя бы один рецепт или пользователь
+    """
+    return (
+        Recipe.objects.filter(image=name).exists()
+        or User.objects.filter(avatar=name).exists()
+    )
+
+
+def get_image_files(name):
+    """
+    Хранилища и имена файлов оригинала и всех его копий
+    """
+    yield default_storage, name
+    for variant in IMAGE_VARIANTS:
+        yield variant_storage, get_variant_name(name, variant)
+
+
+def delete_image(name):
+    """
+    Удаляет файл и его копии.
+    Возвращает количество освобожденных байт
+    """
+    reclaimed = 0
+    for storage, file_name in get_image_files(name):
+        if storage.exists(file_name):
+            reclaimed += storage.size(file_name)
+            storage.delete(file_name)
+    return reclaimed
+
+
+def is_image_recent(name, min_age):
+    """
+    Изменялся ли файл меньше min_age секунд назад
+    """
+    try:
+        modified = default_storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    return modified > timezone.now() - timedelta(seconds=min_age)
+
+
+def release_image(name, min_age=GC_MEDIA_MIN_AGE):
+    """
+    Удаляет файл и его копии, если на него больше никто не ссылается.
+    Недавно сохраненный файл мог переиспользовать другой рецепт,
+    запись которого еще не зафиксирована, поэтому такие файлы
+    остаются, а очередь очистки откладывает их задачи.
+    Возвращает количество освобожденных байт
+    """
+    if (
+        not name
+        or is_image_referenced(name)
+        or is_image_recent(name, min_age)
+    ):
+        return 0
+    return delete_image(name)
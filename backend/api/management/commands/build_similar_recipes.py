@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.cache import bump_catalog_version
+from recipes.constants import (
+    SIMILAR_RECIPES_CHUNK_PAIRS,
+    SIMILAR_RECIPES_COUNT,
+)
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        "Рассчитывает похожие рецепты по общим ингредиентам "
+        "для рецептов, измененных с прошлого запуска"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать похожие рецепты для всех рецептов",
+        )
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=SIMILAR_RECIPES_COUNT,
+            help="Количество похожих рецептов для каждого рецепта",
+        )
+        parser.add_argument(
+            "--max-pairs",
+            type=int,
+            default=SIMILAR_RECIPES_CHUNK_PAIRS,
+            help=(
+                "Сколько пар рецептов с общими ингредиентами "
+                "обрабатывать за раз, ограничивает память"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        recomputed = build_similar_recipes(
+            timezone.now(),
+            full=options["full"],
+            count=options["count"],
+            max_pairs=options["max_pairs"],
+        )
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчитано рецептов: {recomputed} "
+            f"за {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_catalog_version
+from recipes.trending import rebuild_trending_scores, trim_trending_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Сбрасывает затухшие оценки популярности рецептов. "
+        "Запускается периодически, например раз в сутки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Пересчитать все оценки по датам добавления в избранное "
+            "и в списки покупок",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            with transaction.atomic():
+                rebuild_trending_scores()
+            bump_catalog_version()
+            self.stdout.write("Оценки популярности пересчитаны")
+            return
+        trimmed = trim_trending_scores()
+        if trimmed:
+            # Рецепты со сброшенной оценкой выпадают из ordering=trending
+            bump_catalog_version()
+        self.stdout.write(f"Сброшено затухших оценок: {trimmed}")
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from api.constants import (
+    RECIPES_EXPORT_CHUNK_SIZE,
+    RECIPES_TRANSFER_FILE,
+    RECIPES_TRANSFER_IMAGES_DIR,
+)
+from recipes.models import Recipe, RecipeIngredients
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает рецепты в NDJSON-файл с изображениями "
+        "в соседнем каталоге"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Каталог для выгрузки")
+        parser.add_argument(
+            "--chunk-size", type=int, default=RECIPES_EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        images_dir = os.path.join(output, RECIPES_TRANSFER_IMAGES_DIR)
+        os.makedirs(images_dir, exist_ok=True)
+
+        recipes = Recipe.objects.select_related("author").prefetch_related(
+            Prefetch(
+                "ingredient_items",
+                RecipeIngredients.objects.select_related("ingredient"),
+            )
+        ).order_by("pk")
+        count = 0
+        with open(
+            os.path.join(output, RECIPES_TRANSFER_FILE), "w", encoding="utf-8"
+        ) as file:
+            for recipe in recipes.iterator(chunk_size=options["chunk_size"]):
+                file.write(json.dumps(
+                    self.serialize(recipe, images_dir), ensure_ascii=False
+                ))
+                file.write("\n")
+                count += 1
+        self.stdout.write(f"Выгружено рецептов: {count}")
+
+    def serialize(self, recipe, images_dir):
+        return {
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "pub_date": recipe.pub_date.isoformat(),
+            "author": recipe.author.email,
+            "image": self.copy_image(recipe.image.name, images_dir),
+            "ingredients": [
+                {
+                    "name": item.ingredient.name,
+                    "measurement_unit": item.ingredient.measurement_unit,
+                    "amount": item.amount,
+                }
+                for item in recipe.ingredient_items.all()
+            ],
+        }
+
+    def copy_image(self, name, images_dir):
+        """
+        Копирует изображение рядом с выгрузкой.
+        Файлы названы по хэшу содержимого, общие копируются один раз
+        """
+        filename = os.path.basename(name)
+        path = os.path.join(images_dir, filename)
+        if not os.path.exists(path):
+            with default_storage.open(name) as source, \
+                    open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+        return f"{RECIPES_TRANSFER_IMAGES_DIR}/{filename}"
@@ -0,0 +1,121 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.cleanup import drain_cleanup_queue
+from api.constants import (
+    GC_MEDIA_BATCH_SIZE,
+    GC_MEDIA_MIN_AGE,
+    IMAGE_VARIANTS,
+    IMAGE_VARIANTS_DIR,
+)
+from api.images import delete_image, get_image_files, variant_storage
+from recipes.constants import RECIPE_IMAGE_UPLOAD_TO
+from recipes.models import Recipe
+from users.constants import AVATAR_UPLOAD_TO
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Разбирает очередь очистки и удаляет медиафайлы, "
+        "на которые не ссылается ни одна запись"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать файлы, ничего не удаляя",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=GC_MEDIA_MIN_AGE,
+            help=(
+                "Не трогать файлы моложе этого количества секунд: "
+                "запись о них может быть еще не зафиксирована"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        reclaimed = 0 if dry_run else drain_cleanup_queue()
+        files = 0
+        modified_before = timezone.now() - timedelta(
+            seconds=options["min_age"]
+        )
+        for directory in (RECIPE_IMAGE_UPLOAD_TO, AVATAR_UPLOAD_TO):
+            for name in self.find_orphans(directory, modified_before):
+                files += 1
+                if dry_run:
+                    self.stdout.write(name)
+                    reclaimed += sum(
+                        storage.size(file_name)
+                        for storage, file_name in get_image_files(name)
+                        if storage.exists(file_name)
+                    )
+                else:
+                    reclaimed += delete_image(name)
+            for name in self.find_orphan_variants(directory):
+                files += 1
+                reclaimed += variant_storage.size(name)
+                if dry_run:
+                    self.stdout.write(name)
+                else:
+                    variant_storage.delete(name)
+
+        action = "Можно освободить" if dry_run else "Освобождено"
+        self.stdout.write(self.style.SUCCESS(
+            f"Файлов без ссылок: {files}. {action} байт: {reclaimed}"
+        ))
+
+    def find_orphans(self, directory, modified_before):
+        """
+        Файлы каталога, на которые не ссылается ни рецепт, ни пользователь
+        """
+        if not default_storage.exists(directory):
+            return
+        names = [
+            os.path.join(directory, filename)
+            for filename in default_storage.listdir(directory)[1]
+        ]
+        for start in range(0, len(names), GC_MEDIA_BATCH_SIZE):
+            batch = names[start:start + GC_MEDIA_BATCH_SIZE]
+            referenced = set(
+                Recipe.objects.filter(
+                    image__in=batch
+                ).values_list("image", flat=True)
+            ) | set(
+                User.objects.filter(
+                    avatar__in=batch
+                ).values_list("avatar", flat=True)
+            )
+            for name in batch:
+                if (
+                    name not in referenced
+                    and default_storage.get_modified_time(name)
+                    < modified_before
+                ):
+                    yield name
+
+    def find_orphan_variants(self, directory):
+        """
+        Копии, оригинал которых уже удален
+        """
+        variants_directory = os.path.join(directory, IMAGE_VARIANTS_DIR)
+        if not variant_storage.exists(variants_directory):
+            return
+        stems = {
+            os.path.splitext(filename)[0]
+            for filename in default_storage.listdir(directory)[1]
+        }
+        suffixes = tuple(f"_{variant}" for variant in IMAGE_VARIANTS)
+        for filename in variant_storage.listdir(variants_directory)[1]:
+            stem = os.path.splitext(filename)[0]
+            if stem.endswith(suffixes) and stem.rsplit("_", 1)[0] in stems:
+                continue
+            yield os.path.join(variants_directory, filename)
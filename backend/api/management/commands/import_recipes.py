@@ -0,0 +1,300 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from api.cache import bump_catalog_version
+from api.constants import RECIPES_IMPORT_BATCH_SIZE, RECIPES_TRANSFER_FILE
+from api.images import generate_variants
+from recipes.constants import (
+    AMOUNT_MIN_VALUE,
+    COOKING_TIME_MIN_VALUE,
+    RECIPE_IMAGE_UPLOAD_TO,
+    RECIPE_NAME_MAX_LENGTH,
+    SMALL_INTEGER_MAX_VALUE,
+)
+from recipes.counters import increment_counters
+from recipes.data_files import (
+    get_checksum,
+    get_record_checksum,
+    iter_json_objects,
+)
+from recipes.feed import fan_out_recipes
+from recipes.models import (
+    DataImport,
+    DataImportRecord,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+)
+from users.models import User
+
+
+def is_text(value, max_length=None):
+    """
+    Непустая строка не длиннее max_length
+    """
+    return (
+        isinstance(value, str)
+        and value.strip() != ""
+        and (max_length is None or len(value) <= max_length)
+    )
+
+
+def is_number(value, min_value):
+    """
+    Целое число в пределах PositiveSmallIntegerField
+    """
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and min_value <= value <= SMALL_INTEGER_MAX_VALUE
+    )
+
+
+def is_datetime(value):
+    """
+    Строка с датой и временем в формате ISO 8601
+    """
+    try:
+        return isinstance(value, str) and parse_datetime(value) is not None
+    except ValueError:
+        return False
+
+
+def store_image(path):
+    """
+    Проверяет изображение, сохраняет его в хранилище и создает копии.
+    Выполняется в дочернем процессе и не обращается к базе.
+    Возвращает имя файла или None, если файл не удалось прочитать
+    """
+    try:
+        with open(path, "rb") as file:
+            Image.open(file).verify()
+            file.seek(0)
+            name = default_storage.save(
+                RECIPE_IMAGE_UPLOAD_TO + os.path.basename(path), File(file)
+            )
+        generate_variants(name)
+    except Exception:
+        return None
+    return name
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает рецепты из NDJSON-файла, выгруженного export_recipes, "
+        "вместе с изображениями"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Каталог с выгрузкой")
+        parser.add_argument(
+            "--batch-size", type=int, default=RECIPES_IMPORT_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов для обработки изображений",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Загрузить файл, даже если он не изменился",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        file_path = os.path.join(source, RECIPES_TRANSFER_FILE)
+        file_checksum = get_checksum(file_path)
+        if not options["force"] and DataImport.objects.filter(
+            source=RECIPES_TRANSFER_FILE, checksum=file_checksum
+        ).exists():
+            self.stdout.write(
+                f"Файл {file_path} не изменился с последней загрузки"
+            )
+            return
+        data_import, _ = DataImport.objects.get_or_create(
+            source=RECIPES_TRANSFER_FILE, defaults={"checksum": "", "rows": 0}
+        )
+
+        authors = dict(User.objects.values_list("email", "pk"))
+        ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                "pk", "name", "measurement_unit"
+            )
+        }
+        # Дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+
+        started = time.monotonic()
+        imported = skipped = duplicates = read = 0
+        with open(file_path, encoding="utf-8") as file, ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as pool:
+            records = iter_json_objects(file)
+            while batch := list(islice(records, options["batch_size"])):
+                read += len(batch)
+                valid = []
+                for record in batch:
+                    error = self.get_error(record, authors, ingredients)
+                    if error:
+                        skipped += 1
+                        self.stderr.write(f"{self.get_name(record)}: {error}")
+                    else:
+                        valid.append(record)
+                valid, excluded = self.exclude_imported(data_import, valid)
+                duplicates += excluded
+                images = pool.map(store_image, [
+                    os.path.join(source, record["image"])
+                    for record, _ in valid
+                ])
+                rows = []
+                for (record, checksum), image in zip(valid, images):
+                    if image is None:
+                        skipped += 1
+                        self.stderr.write(
+                            f"{record['name']}: не удалось прочитать "
+                            f"изображение {record['image']}"
+                        )
+                    else:
+                        rows.append((record, image, checksum))
+                imported += self.save_batch(
+                    data_import, rows, authors, ingredients
+                )
+        data_import.checksum = file_checksum
+        data_import.rows = read
+        data_import.save(update_fields=("checksum", "rows", "imported_at"))
+        if imported:
+            bump_catalog_version()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"Загружено рецептов: {imported}, пропущено: {skipped}, "
+            f"уже загружено ранее: {duplicates} "
+            f"за {elapsed:.2f} с ({imported / elapsed:.0f} рецептов/с)"
+        )
+
+    def get_name(self, record):
+        if isinstance(record, dict):
+            return record.get("name")
+        return None
+
+    def get_error(self, record, authors, ingredients):
+        """
+        Проверки, которые при обычном создании выполняют сериализатор
+        и валидаторы модели. Запись из файла может быть любым
+        значением JSON, поэтому типы полей проверяются до сравнения
+        """
+        if not isinstance(record, dict):
+            return "запись не является объектом"
+        author = record.get("author")
+        if not isinstance(author, str) or author not in authors:
+            return f"нет автора {author}"
+        if not is_text(record.get("name"), RECIPE_NAME_MAX_LENGTH):
+            return "некорректное название"
+        if not is_text(record.get("text")):
+            return "некорректное описание"
+        if not is_text(record.get("image")):
+            return "нет изображения"
+        if not is_number(record.get("cooking_time"), COOKING_TIME_MIN_VALUE):
+            return "некорректное время приготовления"
+        pub_date = record.get("pub_date")
+        if pub_date is not None and not is_datetime(pub_date):
+            return "некорректная дата публикации"
+        items = record.get("ingredients")
+        if not items or not isinstance(items, list):
+            return "нет ингредиентов"
+        keys = []
+        for item in items:
+            if not isinstance(item, dict) or not all(
+                is_text(item.get(field))
+                for field in ("name", "measurement_unit")
+            ):
+                return "некорректный ингредиент"
+            key = (item["name"], item["measurement_unit"])
+            if key not in ingredients:
+                return f"нет ингредиента {key[0]} ({key[1]})"
+            if not is_number(item.get("amount"), AMOUNT_MIN_VALUE):
+                return f"некорректное количество ингредиента {key[0]}"
+            keys.append(key)
+        if len(keys) != len(set(keys)):
+            return "повторяющиеся ингредиенты"
+        return None
+
+    def exclude_imported(self, data_import, records):
+        """
+        Убирает записи, которые уже загружены из этого источника
+        или повторяются в пачке. Запись определяется контрольной суммой
+        содержимого, поэтому разные рецепты с одинаковым названием
+        загружаются, а повторный запуск после сбоя не создает копии.
+        Возвращает пары (запись, контрольная сумма) и количество убранных
+        """
+        checksums = [get_record_checksum(record) for record in records]
+        imported = set(data_import.records.filter(
+            checksum__in=checksums
+        ).values_list("checksum", flat=True))
+        remaining = []
+        for record, checksum in zip(records, checksums):
+            if checksum not in imported:
+                imported.add(checksum)
+                remaining.append((record, checksum))
+        return remaining, len(records) - len(remaining)
+
+    @transaction.atomic
+    def save_batch(self, data_import, rows, authors, ingredients):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=record["name"],
+                text=record["text"],
+                cooking_time=record["cooking_time"],
+                image=image,
+                # Копии уже созданы в store_image
+                image_variants_ready=True,
+                author_id=authors[record["author"]],
+            )
+            for record, image, _ in rows
+        )
+        # auto_now_add заменяет дату при вставке, возвращаем исходную
+        dated = []
+        for recipe, (record, *_) in zip(recipes, rows):
+            if record.get("pub_date"):
+                recipe.pub_date = parse_datetime(record["pub_date"])
+                dated.append(recipe)
+        Recipe.objects.bulk_update(dated, ("pub_date",))
+        fan_out_recipes(recipes)
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe,
+                ingredient_id=ingredients[
+                    (item["name"], item["measurement_unit"])
+                ],
+                amount=item["amount"],
+            )
+            for recipe, (record, *_) in zip(recipes, rows)
+            for item in record["ingredients"]
+        )
+        DataImportRecord.objects.bulk_create(
+            DataImportRecord(
+                data_import=data_import, checksum=checksum, recipe=recipe
+            )
+            for recipe, (_, _, checksum) in zip(recipes, rows)
+        )
+        # bulk_create не отправляет сигналы
+        increment_counters(Recipe, [recipe.author_id for recipe in recipes])
+        increment_counters(RecipeIngredients, [
+            recipe.pk
+            for recipe, (record, *_) in zip(recipes, rows)
+            for _ in record["ingredients"]
+        ])
+        return len(recipes)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from api.cache import is_cache_shared
+from api.constants import PAGINATION_PAGE_SIZE, RECIPES_CACHE_WARM_PAGES
+from api.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = "Прогревает кэш первых страниц списка рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages", type=int, default=RECIPES_CACHE_WARM_PAGES
+        )
+        parser.add_argument(
+            "--limit", type=int, default=PAGINATION_PAGE_SIZE
+        )
+        parser.add_argument(
+            "--host",
+            default=settings.ALLOWED_HOSTS[0],
+            help="Хост, для которого строятся ссылки на изображения",
+        )
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            raise CommandError(
+                "Кэш хранится в памяти процесса: прогрев не дойдет "
+                "до веб-сервера. Укажите общий CACHE_BACKEND"
+            )
+        view = RecipeViewSet.as_view({"get": "list"})
+        factory = RequestFactory(HTTP_HOST=options["host"])
+        # Параметры и их порядок совпадают с запросами фронтенда
+        for page in range(1, options["pages"] + 1):
+            response = view(factory.get(
+                "/api/recipes/",
+                {"page": page, "limit": options["limit"]},
+            ))
+            if response.status_code != 200:
+                break
+            self.stdout.write(f"Страница {page} в кэше")
+            if not response.data["next"]:
+                break
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleanupTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('file', 'Файл'), ('user', 'Пользователь')], max_length=16, verbose_name='Тип')),
+                ('target', models.CharField(max_length=255, verbose_name='Имя файла или id пользователя')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'задача очистки',
+                'verbose_name_plural': 'задачи очистки',
+                'ordering': ('id',),
+                'constraints': [models.UniqueConstraint(fields=('kind', 'target'), name='unique_cleanup_task')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cleanuptask',
+            name='run_after',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Выполнить после'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+from .constants import CLEANUP_KIND_MAX_LENGTH, CLEANUP_TARGET_MAX_LENGTH
+
+
+class CleanupTask(models.Model):
+    """
+    Модель для задачи фоновой очистки.
+    Задача создается в той же транзакции, что и удаление,
+    поэтому не теряется при перезапуске процесса
+    """
+    FILE = "file"
+    USER = "user"
+    KIND_CHOICES = (
+        (FILE, "Файл"),
+        (USER, "Пользователь"),
+    )
+
+    kind = models.CharField(
+        max_length=CLEANUP_KIND_MAX_LENGTH,
+        choices=KIND_CHOICES,
+        verbose_name="Тип",
+    )
+    target = models.CharField(
+        max_length=CLEANUP_TARGET_MAX_LENGTH,
+        verbose_name="Имя файла или id пользователя",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата создания",
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name="Выполнить после",
+    )
+
+    class Meta:
+        verbose_name = "задача очистки"
+        verbose_name_plural = "задачи очистки"
+        ordering = ("id",)
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=("kind", "target"),
+                name="unique_cleanup_task",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.target}"
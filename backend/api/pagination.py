@@ -1,17 +1,189 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from .constants import (
+    ERROR_INVALID_CURSOR,
+    PAGINATION_CURSOR_QUERY_PARAM,
     PAGINATION_MAX_PAGE_SIZE,
     PAGINATION_PAGE_SIZE,
     PAGINATION_PAGE_SIZE_QUERY_PARAM,
 )
 
 
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSONEncoder для значений курсора.
+    Сохраняет время с микросекундами, чтобы сравнение было точным
+    """
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
 class LimitPagination(PageNumberPagination):
     """
     Paginator с возможностью установки лимита
-    на количество элементов на странице
+    на количество элементов на странице.
+    При наличии параметра cursor переключается в режим курсора:
+    страница выбирается по значениям полей сортировки последнего
+    элемента предыдущей страницы, без COUNT(*) и OFFSET
     """
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = PAGINATION_PAGE_SIZE_QUERY_PARAM
     max_page_size = PAGINATION_MAX_PAGE_SIZE
+    cursor_query_param = PAGINATION_CURSOR_QUERY_PARAM
+    invalid_cursor_message = ERROR_INVALID_CURSOR
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Выбирает режим пагинации по параметрам запроса
+        """
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_queryset_by_cursor(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_cursor_link(),
+            "results": data,
+        })
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        """
+        Возвращает страницу, следующую за позицией из курсора
+        """
+        self.request = request
+        self.display_page_controls = False
+        self.ordering = self.get_cursor_ordering(queryset)
+        page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(
+            queryset, request.query_params[self.cursor_query_param]
+        )
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        results = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = [
+                getattr(results[-1], field.lstrip("-"))
+                for field in self.ordering
+            ]
+        return results
+
+    def paginate_keys(self, request, queryset, ordering, get_keys):
+        """
+        Курсорная страница, позиции которой выбирает
+        get_keys(позиция, количество) - список значений полей ordering,
+        последнее из них - первичный ключ. Объекты страницы загружаются
+        из queryset одним запросом
+        """
+        self.request = request
+        self.cursor_mode = True
+        self.display_page_controls = False
+        self.ordering = list(ordering)
+        page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(
+            queryset, request.query_params.get(self.cursor_query_param)
+        )
+        keys = get_keys(position, page_size + 1)
+        self.next_position = None
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            self.next_position = list(keys[-1])
+        objects = queryset.in_bulk([key[-1] for key in keys])
+        return [objects[key[-1]] for key in keys if key[-1] in objects]
+
+    def get_cursor_ordering(self, queryset):
+        """
+        Поля сортировки queryset, дополненные первичным ключом,
+        чтобы позиция курсора была однозначной
+        """
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        pk_name = queryset.model._meta.pk.name
+        if not any(
+            field.lstrip("-") in ("pk", pk_name) for field in ordering
+        ):
+            descending = bool(ordering) and ordering[0].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    def get_seek_filter(self, position):
+        """
+        Условие "строго после позиции" для составного ключа сортировки
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, queryset, cursor):
+        """
+        Разбирает курсор в значения полей сортировки.
+        Пустой курсор означает первую страницу
+        """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.get_ordering_field(queryset, field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (
+            binascii.Error, TypeError, ValueError, ValidationError
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_ordering_field(self, queryset, field):
+        """
+        Поле модели или аннотации, по которому идет сортировка
+        """
+        name = field.lstrip("-")
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == "pk":
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            json.dumps(position, cls=CursorEncoder).encode()
+        ).decode()
+
+    def get_next_cursor_link(self):
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
@@ -0,0 +1,130 @@
+import csv
+import json
+from itertools import groupby
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+def group_by_recipe(breakdown):
+    """
+    Группирует упорядоченные по рецепту строки ингредиентов
+    """
+    return groupby(
+        breakdown,
+        key=lambda item: (item["recipe_id"], item["recipe__name"]),
+    )
+
+
+class Echo:
+    """
+    Файлоподобный объект, который возвращает записанную строку,
+    чтобы csv.writer отдавал строки по одной
+    """
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """
+    Базовый renderer списка покупок.
+    Сам файл отдается потоком через stream(), а render() нужен только
+    для ответов с ошибками, которые остаются в формате JSON
+    """
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    """
+    Список покупок в текстовом виде
+    """
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, totals, breakdown=None):
+        yield "Список ваших покупок:"
+        for item in totals:
+            yield (
+                f"\n{item['ingredient__name']} "
+                f"({item['ingredient__measurement_unit']})"
+                f" — {item['total_amount']}"
+            )
+        if breakdown is None:
+            return
+        yield "\n\nПо рецептам:"
+        for (_, recipe_name), items in group_by_recipe(breakdown):
+            yield f"\n\n{recipe_name}:"
+            for item in items:
+                yield (
+                    f"\n  {item['ingredient__name']} "
+                    f"({item['ingredient__measurement_unit']})"
+                    f" — {item['amount']}"
+                )
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    """
+    Список покупок в формате CSV
+    """
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, totals, breakdown=None):
+        writer = csv.writer(Echo())
+        yield writer.writerow(("ingredient", "measurement_unit", "amount"))
+        for item in totals:
+            yield writer.writerow((
+                item["ingredient__name"],
+                item["ingredient__measurement_unit"],
+                item["total_amount"],
+            ))
+        if breakdown is None:
+            return
+        yield writer.writerow(())
+        yield writer.writerow(
+            ("recipe", "ingredient", "measurement_unit", "amount")
+        )
+        for item in breakdown:
+            yield writer.writerow((
+                item["recipe__name"],
+                item["ingredient__name"],
+                item["ingredient__measurement_unit"],
+                item["amount"],
+            ))
+
+
+class ShoppingCartJSONRenderer(JSONRenderer):
+    """
+    Список покупок в формате JSON
+    """
+    def stream(self, totals, breakdown=None):
+        yield '{"ingredients": ['
+        for index, item in enumerate(totals):
+            yield ", " * bool(index) + json.dumps({
+                "name": item["ingredient__name"],
+                "measurement_unit": item["ingredient__measurement_unit"],
+                "amount": item["total_amount"],
+            }, ensure_ascii=False)
+        yield "]"
+        if breakdown is not None:
+            yield ', "recipes": ['
+            for index, ((_, recipe_name), items) in enumerate(
+                group_by_recipe(breakdown)
+            ):
+                yield ", " * bool(index) + json.dumps({
+                    "name": recipe_name,
+                    "ingredients": [
+                        {
+                            "name": item["ingredient__name"],
+                            "measurement_unit": (
+                                item["ingredient__measurement_unit"]
+                            ),
+                            "amount": item["amount"],
+                        }
+                        for item in items
+                    ],
+                }, ensure_ascii=False)
+            yield "]"
+        yield "}"
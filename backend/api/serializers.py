@@ -1,11 +1,17 @@
+import json
+
+from django.db import transaction
+from django.http import QueryDict
 from rest_framework import serializers
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 
 from recipes.constants import AMOUNT_MIN_VALUE, AMOUNT_MIN_VALUE_ERROR_MESSAGE
+from recipes.counters import delete_counted, increment_counters
 from recipes.models import Ingredient, Recipe, RecipeIngredients
+from recipes.shopping_totals import change_recipe_in_shopping_totals
 from users.models import User
-from .constants import RECIPES_LIMIT_QUERY_PARAM
+from .constants import BULK_IDS_MAX_LENGTH, SEARCH_RESULT_FIELDS
+from .fields import ImageVariantsField, LimitedBase64ImageField
 
 
 class AppUserCreateSerializer(UserCreateSerializer):
@@ -30,6 +36,9 @@ class AppUserSerializer(UserSerializer):
     """
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.ImageField(read_only=True)
+    avatar_variants = ImageVariantsField(
+        source="avatar", ready_source="avatar_variants_ready"
+    )
 
     class Meta:
         model = User
@@ -41,12 +50,17 @@ class AppUserSerializer(UserSerializer):
             "last_name",
             "is_subscribed",
             "avatar",
+            "avatar_variants",
+            "recipes_count",
+            "subscribers_count",
         )
 
     def get_is_subscribed(self, obj):
         """
         Проверяет, подписан ли текущий пользователь на данного пользователя
         """
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context.get("request").user
         if user.is_authenticated:
             return obj.author.filter(user=user).exists()
@@ -55,10 +69,11 @@ class AppUserSerializer(UserSerializer):
 
 class UserSubscriptionSerializer(AppUserSerializer):
     """
-    Serializer для подписки на автора
+    Serializer для подписки на автора.
+    Ожидает авторов с рецептами, подгруженными
+    с учетом лимита (см. AppUserViewSet)
     """
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source="recipes.count")
 
     class Meta:
         model = User
@@ -70,29 +85,18 @@ class UserSubscriptionSerializer(AppUserSerializer):
             "email",
             "is_subscribed",
             "avatar",
+            "avatar_variants",
             "recipes",
             "recipes_count",
+            "subscribers_count",
         )
 
     def get_recipes(self, obj):
         """
-        Получает список рецептов автора с учетом лимита
+        Получает подгруженный список рецептов автора
         """
-        recipes_limit = self.context.get("request").query_params.get(
-            RECIPES_LIMIT_QUERY_PARAM
-        )
-        try:
-            recipes_limit = (int(recipes_limit) if recipes_limit is not None
-                             else None)
-        except ValueError:
-            recipes_limit = None
-
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:recipes_limit]
-
         return ShortRecipeSerializer(
-            recipes,
+            obj.limited_recipes,
             context={"request": self.context.get("request")},
             many=True
         ).data
@@ -102,7 +106,7 @@ class UserAvatarSerializer(serializers.ModelSerializer):
     """
     Serializer для обновления аватара пользователя
     """
-    avatar = Base64ImageField()
+    avatar = LimitedBase64ImageField()
 
     class Meta:
         model = User
@@ -143,15 +147,39 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         }
 
 
+class CreateUpdateRecipeIngredientsListSerializer(serializers.ListSerializer):
+    """
+    Находит все переданные ингредиенты одним запросом
+    и сообщает обо всех несуществующих id сразу
+    """
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredient_ids = list(dict.fromkeys(item["id"] for item in items))
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = [
+            str(ingredient_id)
+            for ingredient_id in ingredient_ids
+            if ingredient_id not in ingredients
+        ]
+        if missing:
+            raise serializers.ValidationError(
+                f"Ингредиенты не найдены: {', '.join(missing)}"
+            )
+        for item in items:
+            item["id"] = ingredients[item["id"]]
+        return items
+
+
 class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
     """
     Serializer для создания и обновления связей между рецептами и ингредиентами
     """
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredients
         fields = ("id", "amount")
+        list_serializer_class = CreateUpdateRecipeIngredientsListSerializer
         # Не дублируем написание валидатора из модели
         extra_kwargs = {
             'amount': {
@@ -175,15 +203,26 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(
+        source="image", ready_source="image_variants_ready"
+    )
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = (
+            "pub_date",
+            "updated_at",
+            "similar_computed_at",
+            "trending_score",
+            "image_variants_ready",
+        )
 
     def get_is_favorited(self, obj):
         """
         Метод для проверки, добавлен ли рецепт в избранное пользователем
         """
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         user = self.context.get("request").user
         if user.is_authenticated:
             return user.favorite.filter(recipe=obj).exists()
@@ -193,6 +232,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         """
         Метод для проверки, добавлен ли рецепт в список покупок пользователем
         """
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         user = self.context.get("request").user
         if user.is_authenticated:
             return user.shopping_list.filter(
@@ -200,6 +241,18 @@ class RecipeSerializer(serializers.ModelSerializer):
             ).exists()
         return False
 
+    def to_representation(self, instance):
+        """
+        В результатах поиска добавляет фрагмент описания
+        с выделенными словами запроса, в подборе по ингредиентам -
+        число имеющихся и недостающих ингредиентов
+        """
+        data = super().to_representation(instance)
+        for field in SEARCH_RESULT_FIELDS:
+            if hasattr(instance, field):
+                data[field] = getattr(instance, field)
+        return data
+
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -207,11 +260,32 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """
     author = AppUserSerializer(read_only=True)
     ingredients = CreateUpdateRecipeIngredientsSerializer(many=True)
-    image = Base64ImageField(required=True)
+    image = LimitedBase64ImageField(required=True)
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = (
+            "pub_date",
+            "updated_at",
+            "similar_computed_at",
+            "trending_score",
+            "image_variants_ready",
+        )
+
+    def to_internal_value(self, data):
+        """
+        В multipart/form-data ингредиенты передаются строкой JSON
+        """
+        if isinstance(data, QueryDict):
+            data = data.dict()
+            if isinstance(data.get("ingredients"), str):
+                try:
+                    data["ingredients"] = json.loads(data["ingredients"])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {"ingredients": "Некорректный JSON ингредиентов"}
+                    )
+        return super().to_internal_value(data)
 
     def validate(self, data):
         """
@@ -249,7 +323,12 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
             for ingredient_data in ingredients_data
         ])
+        # bulk_create не отправляет сигналы
+        increment_counters(
+            RecipeIngredients, [recipe.pk] * len(ingredients_data)
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Метод для создания нового рецепта
@@ -259,22 +338,72 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         self._create_ingredients(recipe, ingredients_data)
         return recipe
 
+    def _update_ingredients(self, recipe, ingredients_data):
+        """
+        Записывает только отличия от текущих ингредиентов рецепта.
+        Удаленные строки вычитает из списков покупок delete_counted,
+        а для измененных и добавленных bulk_update и bulk_create
+        сигналов не отправляют, поэтому возвращаются их изменения
+        количества {id ингредиента: изменение}
+        """
+        current = {
+            item.ingredient_id: item for item in recipe.ingredient_items.all()
+        }
+        submitted = {
+            ingredient_data["id"].pk: ingredient_data
+            for ingredient_data in ingredients_data
+        }
+        deltas = {}
+        removed = []
+        changed = []
+        for ingredient_id, item in current.items():
+            ingredient_data = submitted.get(ingredient_id)
+            if ingredient_data is None:
+                removed.append(item.pk)
+            elif ingredient_data["amount"] != item.amount:
+                deltas[ingredient_id] = ingredient_data["amount"] - item.amount
+                item.amount = ingredient_data["amount"]
+                changed.append(item)
+        added = [
+            ingredient_data
+            for ingredient_id, ingredient_data in submitted.items()
+            if ingredient_id not in current
+        ]
+        for ingredient_data in added:
+            deltas[ingredient_data["id"].pk] = ingredient_data["amount"]
+
+        if removed:
+            delete_counted(RecipeIngredients.objects.filter(pk__in=removed))
+        if changed:
+            RecipeIngredients.objects.bulk_update(changed, ("amount",))
+        if added:
+            self._create_ingredients(recipe, added)
+        return deltas
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         """
         Метод для обновления существующего рецепта
         """
         ingredients_data = validated_data.pop("ingredients")
-        instance.ingredients.clear()
-        self._create_ingredients(instance, ingredients_data)
+        deltas = self._update_ingredients(instance, ingredients_data)
+        change_recipe_in_shopping_totals(instance.pk, deltas)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         """
-        Метод для представления рецепта после создания/обновления
+        Метод для представления рецепта после создания/обновления.
+        Рецепт перечитывается со связанными данными, чтобы число
+        запросов не зависело от количества ингредиентов
         """
+        request = self.context.get("request")
+        if request is not None:
+            instance = Recipe.objects.with_user_relations(
+                request.user
+            ).get(pk=instance.pk)
         return RecipeSerializer(
             instance,
-            context={"request": self.context.get("request")}
+            context={"request": request}
         ).data
 
 
@@ -282,6 +411,27 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     """
     Краткий Serializer для  Recipe для краткого представления рецептов
     """
+    image_variants = ImageVariantsField(
+        source="image", ready_source="image_variants_ready"
+    )
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """
+    Serializer для списка id в групповых операциях
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_IDS_MAX_LENGTH,
+    )
+
+    def validate_ids(self, value):
+        """
+        Убирает повторы, сохраняя порядок
+        """
+        return list(dict.fromkeys(value))
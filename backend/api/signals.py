@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingCart,
+)
+from users.models import Subscription, User
+from .cache import bump_catalog_version, bump_relations_versions
+from .cleanup import enqueue_files
+from .images import schedule_variants
+
+# Поля автора, которые попадают в ответы со списком рецептов
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name", "avatar"}
+# Поля с изображениями, на файлы которых считаются ссылки
+IMAGE_FIELDS = {Recipe: "image", User: "avatar"}
+# Поля с отметкой о готовности уменьшенных копий
+VARIANTS_READY_FIELDS = {
+    Recipe: "image_variants_ready",
+    User: "avatar_variants_ready",
+}
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+@receiver((post_save, post_delete), sender=Ingredient)
+def recipes_catalog_changed(**kwargs):
+    """
+    Меняет версию каталога рецептов после фиксации транзакции
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(update_fields=None, **kwargs):
+    """
+    Меняет версию каталога рецептов при изменении данных автора
+    """
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def user_relations_changed(instance, **kwargs):
+    """
+    Меняет версию связей пользователя и версию каталога
+    после фиксации транзакции
+    """
+    transaction.on_commit(
+        lambda: bump_relations_versions(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(instance, **kwargs):
+    """
+    Создает уменьшенные копии изображения рецепта в фоне
+    """
+    schedule_variants(instance.image.name)
+
+
+@receiver(post_save, sender=User)
+def user_avatar_saved(instance, update_fields=None, **kwargs):
+    """
+    Создает уменьшенные копии аватара в фоне
+    """
+    if update_fields is None or "avatar" in update_fields:
+        schedule_variants(instance.avatar.name)
+
+
+@receiver(post_init, sender=Recipe)
+@receiver(post_init, sender=User)
+def remember_image(sender, instance, **kwargs):
+    """
+    Запоминает имя файла, загруженное из базы.
+    Отложенное поле не читается, чтобы не делать лишний запрос
+    """
+    value = instance.__dict__.get(IMAGE_FIELDS[sender])
+    instance._stored_image = getattr(value, "name", value)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def image_replaced(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Освобождает прежний файл после замены изображения
+    и снимает отметку о готовности копий до их создания
+    """
+    field = IMAGE_FIELDS[sender]
+    name = getattr(instance, field).name
+    stored = getattr(instance, "_stored_image", None)
+    if not created and stored and stored != name:
+        enqueue_files([stored])
+    if (
+        not created
+        and (update_fields is None or field in update_fields)
+        and stored != name
+    ):
+        ready_field = VARIANTS_READY_FIELDS[sender]
+        sender.objects.filter(pk=instance.pk).update(**{ready_field: False})
+        setattr(instance, ready_field, False)
+    instance._stored_image = name
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def image_deleted(sender, instance, **kwargs):
+    """
+    Освобождает файл удаленной записи
+    """
+    enqueue_files([getattr(instance, IMAGE_FIELDS[sender]).name])
@@ -0,0 +1,44 @@
+import hashlib
+import os
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, которое называет файлы по хэшу содержимого.
+    Одинаковые загрузки сохраняются в один файл, а содержимое файла
+    под заданным именем никогда не меняется
+    """
+    def __init__(self, **kwargs):
+        # Одновременная загрузка одинаковых файлов пишет те же байты
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        try:
+            # Совпавший файл становится "молодым": очистка не удаляет
+            # его, пока запись со ссылкой на него не зафиксирована
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
+
+    def get_hashed_name(self, name, content):
+        """
+        recipes/photo.PNG -> recipes/<sha256 содержимого>.png
+        """
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, hasher.hexdigest() + extension
+        ).replace("\\", "/")
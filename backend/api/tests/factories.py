@@ -0,0 +1,77 @@
+import io
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredients
+from users.models import User
+
+# Медиафайлы тестов пишутся во временный каталог:
+# классы тестов переопределяют MEDIA_ROOT на него
+MEDIA_ROOT = tempfile.mkdtemp(prefix="foodgram-tests-")
+
+
+def create_image(color="red"):
+    """
+    Загруженный файл PNG 8×8 заданного цвета
+    """
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return SimpleUploadedFile(
+        "image.png", buffer.getvalue(), content_type="image/png"
+    )
+
+
+def create_user(index):
+    """
+    Пользователь с уникальными email и username
+    """
+    return User.objects.create_user(
+        email=f"user-{index}@example.com",
+        username=f"user-{index}",
+        first_name="Имя",
+        last_name="Фамилия",
+        password="password-1234",
+    )
+
+
+def create_client(user=None):
+    """
+    Клиент API, авторизованный токеном пользователя
+    """
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def create_ingredients(count):
+    """
+    count ингредиентов каталога
+    """
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f"ингредиент-{i}", measurement_unit="г")
+        for i in range(count)
+    )
+
+
+def create_recipe(author, ingredients, name="Рецепт"):
+    """
+    Рецепт с ингредиентами по 10 единиц каждого
+    """
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text="Описание",
+        cooking_time=10,
+        image=create_image(),
+    )
+    for ingredient in ingredients:
+        RecipeIngredients.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=10
+        )
+    return recipe
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+
+from api.bulk import add_relations
+from api.constants import BULK_CREATE_RETRIES
+from recipes.models import Favorite
+from .factories import (
+    MEDIA_ROOT,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AddRelationsRetryTests(TestCase):
+    """
+    Вставка связей повторяется только после нарушения уникальности
+    и ограниченное число раз
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.recipe = create_recipe(cls.user, create_ingredients(1))
+
+    def add_failing(self, message):
+        with mock.patch.object(
+            QuerySet, "bulk_create", side_effect=IntegrityError(message)
+        ) as bulk_create, self.assertRaises(IntegrityError):
+            add_relations(Favorite, self.user, "recipe", [self.recipe.pk])
+        return bulk_create.call_count
+
+    def test_other_integrity_error_not_retried(self):
+        self.assertEqual(self.add_failing("CHECK constraint failed"), 1)
+
+    def test_unique_violation_retries_limited(self):
+        self.assertEqual(
+            self.add_failing("UNIQUE constraint failed: recipes_favorite"),
+            BULK_CREATE_RETRIES + 1,
+        )
+
+    def test_adds_missing(self):
+        self.assertEqual(
+            add_relations(Favorite, self.user, "recipe", [self.recipe.pk]),
+            {self.recipe.pk},
+        )
+        self.assertTrue(Favorite.objects.filter(user=self.user).exists())
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.cache import bump_relations_versions, get_catalog_version
+from api.constants import RECIPES_COUNTERS_THROTTLE_CACHE_KEY
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AnonymousCacheTests(TestCase):
+    """
+    Ответы анонимным пользователям и их ETag учитывают
+    изменения счетчиков, сделанные другими пользователями
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(1)
+        author = create_user(2)
+        ingredients = create_ingredients(1)
+        self.recipe = create_recipe(author, ingredients, name="Первый")
+        self.other = create_recipe(author, ingredients, name="Второй")
+
+    def add_favorite(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = create_client(self.user).post(
+                f"/api/recipes/{recipe.pk}/favorite/"
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_detail_etag_changes_on_favorite(self):
+        client = create_client()
+        url = f"/api/recipes/{self.recipe.pk}/"
+        etag = client.get(url)["ETag"]
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        self.add_favorite(self.recipe)
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["favorites_count"], 1)
+
+    def test_cached_list_follows_popularity(self):
+        client = create_client()
+        url = "/api/recipes/?ordering=popular"
+        self.add_favorite(self.recipe)
+        self.assertEqual(
+            client.get(url).json()["results"][0]["id"], self.recipe.pk
+        )
+
+        self.add_favorite(self.other)
+        self.user = create_user(3)
+        self.add_favorite(self.other)
+        cache.delete(RECIPES_COUNTERS_THROTTLE_CACHE_KEY)
+
+        results = client.get(url).json()["results"]
+        self.assertEqual(results[0]["id"], self.other.pk)
+        self.assertEqual(results[0]["favorites_count"], 2)
+
+    def test_cached_trending_list_refreshed(self):
+        client = create_client()
+        url = "/api/recipes/?ordering=trending"
+        self.assertEqual(client.get(url).json()["count"], 0)
+
+        self.add_favorite(self.other)
+
+        results = client.get(url).json()["results"]
+        self.assertEqual([item["id"] for item in results], [self.other.pk])
+
+    def test_counters_refresh_throttled(self):
+        client = create_client()
+        url = f"/api/recipes/{self.recipe.pk}/"
+        self.add_favorite(self.other)
+        etag = client.get(url)["ETag"]
+
+        self.add_favorite(self.recipe)
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        cache.delete(RECIPES_COUNTERS_THROTTLE_CACHE_KEY)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["favorites_count"], 1)
+
+    def test_relations_keep_catalog_version(self):
+        version = get_catalog_version()
+        bump_relations_versions(self.user.pk)
+        self.assertEqual(get_catalog_version(), version)
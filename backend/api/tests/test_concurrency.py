@@ -0,0 +1,92 @@
+import threading
+from collections import Counter
+
+from django.db import connections
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+THREADS_COUNT = 8
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ConcurrentRelationsTests(TransactionTestCase):
+    """
+    Одновременные запросы на создание одной и той же связи:
+    создается ровно одна строка, счетчик увеличивается один раз
+    """
+    def setUp(self):
+        self.user = create_user(1)
+        self.author = create_user(2)
+        self.recipe = create_recipe(self.author, create_ingredients(1))
+
+    def post_concurrently(self, url):
+        """
+        Отправляет THREADS_COUNT одинаковых запросов одновременно.
+        Возвращает счетчик кодов ответов
+        """
+        clients = [create_client(self.user) for _ in range(THREADS_COUNT)]
+        barrier = threading.Barrier(THREADS_COUNT)
+        statuses = []
+
+        def post(client):
+            try:
+                barrier.wait()
+                statuses.append(client.post(url).status_code)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=post, args=(client,))
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return Counter(statuses)
+
+    def assert_single_success(self, statuses):
+        self.assertEqual(
+            statuses, Counter({201: 1, 400: THREADS_COUNT - 1})
+        )
+
+    def test_favorite(self):
+        self.assert_single_success(self.post_concurrently(
+            f"/api/recipes/{self.recipe.pk}/favorite/"
+        ))
+        self.assertEqual(Favorite.objects.count(), 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count, 1
+        )
+
+    def test_shopping_cart(self):
+        self.assert_single_success(self.post_concurrently(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        ))
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).shopping_count, 1
+        )
+
+    def test_subscribe(self):
+        self.assert_single_success(self.post_concurrently(
+            f"/api/users/{self.author.pk}/subscribe/"
+        ))
+        self.assertEqual(Subscription.objects.count(), 1)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).subscribers_count, 1
+        )
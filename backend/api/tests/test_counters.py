@@ -0,0 +1,58 @@
+from django.contrib import admin
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DeleteCountedTests(TransactionTestCase):
+    """
+    Удаления через delete_counted вне транзакции запроса:
+    блокировка строк должна открывать транзакцию сама
+    """
+    def setUp(self):
+        self.user = create_user(1)
+        self.author = create_user(2)
+        self.recipe = create_recipe(self.author, create_ingredients(1))
+
+    def test_unsubscribe(self):
+        create_client(self.user).post(
+            f"/api/users/{self.author.pk}/subscribe/"
+        )
+        response = create_client(self.user).delete(
+            f"/api/users/{self.author.pk}/subscribe/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Subscription.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 0)
+
+    def test_admin_delete_queryset(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        admin.site._registry[Favorite].delete_queryset(
+            None, Favorite.objects.all()
+        )
+        self.assertFalse(Favorite.objects.exists())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_admin_delete_recipes(self):
+        admin.site._registry[Recipe].delete_queryset(
+            None, Recipe.objects.all()
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).recipes_count, 0
+        )
@@ -0,0 +1,53 @@
+import json
+
+from django.test import TestCase, override_settings
+
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DownloadShoppingCartTests(TestCase):
+    """
+    Разбивка по рецептам включается только логическим значением
+    параметра breakdown
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        recipe = create_recipe(cls.user, create_ingredients(2))
+        create_client(cls.user).post(
+            f"/api/recipes/{recipe.pk}/shopping_cart/"
+        )
+
+    def download(self, breakdown):
+        return create_client(self.user).get(
+            "/api/recipes/download_shopping_cart/",
+            {"format": "json", "breakdown": breakdown},
+        )
+
+    def get_content(self, breakdown):
+        response = self.download(breakdown)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_false_values(self):
+        for value in ("0", "false", "False", "no", ""):
+            with self.subTest(value=value):
+                self.assertNotIn("recipes", self.get_content(value))
+
+    def test_true_values(self):
+        for value in ("1", "true", "yes"):
+            with self.subTest(value=value):
+                self.assertEqual(len(self.get_content(value)["recipes"]), 1)
+
+    def test_invalid_value(self):
+        response = self.download("maybe")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("breakdown", json.loads(response.content))
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.test import TestCase, override_settings
+
+from recipes import feed
+from recipes.models import FeedEntry
+from users.models import Subscription
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UnsubscribeFeedTests(TestCase):
+    """
+    Отписка убирает рецепты автора из ленты ровно один раз
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        cls.author = create_user(2)
+        cls.recipe = create_recipe(cls.author, create_ingredients(1))
+
+    def setUp(self):
+        response = create_client(self.user).post(
+            f"/api/users/{self.author.pk}/subscribe/"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(FeedEntry.objects.filter(user=self.user).exists())
+        remove_from_feed = mock.Mock(wraps=feed.remove_from_feed)
+        for target in (
+            "api.views.remove_from_feed",
+            "recipes.signals.remove_from_feed",
+            "users.admin.remove_from_feed",
+        ):
+            patcher = mock.patch(target, remove_from_feed)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.remove_from_feed = remove_from_feed
+
+    def test_unsubscribe(self):
+        response = create_client(self.user).delete(
+            f"/api/users/{self.author.pk}/subscribe/"
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.remove_from_feed.assert_called_once()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    def test_admin_delete_queryset(self):
+        admin.site._registry[Subscription].delete_queryset(
+            None, Subscription.objects.all()
+        )
+
+        self.remove_from_feed.assert_called_once()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    def test_instance_delete(self):
+        Subscription.objects.get(user=self.user).delete()
+
+        self.remove_from_feed.assert_called_once()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
@@ -0,0 +1,83 @@
+import base64
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.images import get_variant_name, run_generate_variants, variant_storage
+from recipes.models import Recipe
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_image,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTests(TestCase):
+    """
+    Ссылки на копии строятся по отметке о готовности,
+    без обращений к хранилищу при каждом ответе
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.ingredients = create_ingredients(2)
+
+    def setUp(self):
+        cache.clear()
+        self.recipe = create_recipe(self.author, self.ingredients)
+
+    def get_variants(self):
+        response = create_client().get(f"/api/recipes/{self.recipe.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["image_variants"]
+
+    def test_original_until_variants_ready(self):
+        for url in self.get_variants().values():
+            self.assertTrue(url.endswith(self.recipe.image.url))
+
+    def test_ready_variants_without_storage_calls(self):
+        name = self.recipe.image.name
+        run_generate_variants(name)
+        self.assertTrue(
+            Recipe.objects.get(pk=self.recipe.pk).image_variants_ready
+        )
+
+        with mock.patch.object(variant_storage, "exists") as exists:
+            variants = self.get_variants()
+
+        exists.assert_not_called()
+        for variant, url in variants.items():
+            self.assertTrue(url.endswith(
+                variant_storage.url(get_variant_name(name, variant))
+            ))
+
+    def test_replaced_image_resets_ready(self):
+        run_generate_variants(self.recipe.image.name)
+        image = base64.b64encode(create_image("blue").read()).decode()
+
+        response = create_client(self.author).patch(
+            f"/api/recipes/{self.recipe.pk}/",
+            {
+                "image": f"data:image/png;base64,{image}",
+                "ingredients": [
+                    {"id": ingredient.pk, "amount": 10}
+                    for ingredient in self.ingredients
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_variants_ready)
+        for url in response.data["image_variants"].values():
+            self.assertTrue(url.endswith(self.recipe.image.url))
+
+        run_generate_variants(self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_variants_ready)
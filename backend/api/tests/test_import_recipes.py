@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from api.constants import RECIPES_TRANSFER_FILE
+from recipes.models import Recipe
+from .factories import (
+    MEDIA_ROOT,
+    create_image,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImportRecipesTests(TransactionTestCase):
+    """
+    Некорректные записи пропускаются, не прерывая загрузку,
+    а повторный запуск не создает копии рецептов
+    """
+    def setUp(self):
+        self.author = create_user(1)
+        self.ingredient = create_ingredients(1)[0]
+        self.source = tempfile.mkdtemp(dir=MEDIA_ROOT)
+        with open(os.path.join(self.source, "image.png"), "wb") as file:
+            file.write(create_image().read())
+
+    def get_record(self, name, **fields):
+        return {
+            "name": name,
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": "image.png",
+            "author": self.author.email,
+            "ingredients": [{
+                "name": self.ingredient.name,
+                "measurement_unit": self.ingredient.measurement_unit,
+                "amount": 10,
+            }],
+            **fields,
+        }
+
+    def write_records(self, records):
+        path = os.path.join(self.source, RECIPES_TRANSFER_FILE)
+        with open(path, "w", encoding="utf-8") as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def run_import(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_recipes",
+            self.source,
+            "--workers",
+            "1",
+            "--batch-size",
+            "2",
+            *args,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_invalid_records_skipped(self):
+        self.write_records([
+            self.get_record("Первый"),
+            ["не объект"],
+            self.get_record("Строка вместо числа", cooking_time="10"),
+            self.get_record("Без описания", text=None),
+            self.get_record("Длинное название" * 20),
+            self.get_record("Без количества", ingredients=[{
+                "name": self.ingredient.name,
+                "measurement_unit": self.ingredient.measurement_unit,
+            }]),
+            self.get_record("Ингредиент не объект", ingredients=["соль"]),
+            self.get_record("Неверная дата", pub_date="вчера"),
+            self.get_record("Последний"),
+        ])
+
+        _, stderr = self.run_import()
+
+        self.assertEqual(
+            set(Recipe.objects.values_list("name", flat=True)),
+            {"Первый", "Последний"},
+        )
+        self.assertEqual(len(stderr.splitlines()), 7)
+
+    def test_rerun_does_not_duplicate(self):
+        self.write_records([
+            self.get_record("Первый"),
+            self.get_record("Второй"),
+            self.get_record("Первый"),
+        ])
+        self.run_import()
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        stdout, _ = self.run_import()
+        self.assertIn("не изменился", stdout)
+
+        stdout, _ = self.run_import("--force")
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertIn("Загружено рецептов: 0", stdout)
+        self.assertIn("уже загружено ранее: 3", stdout)
+
+    def test_same_name_different_recipes(self):
+        create_recipe(self.author, [self.ingredient], name="Суп")
+        self.write_records([
+            self.get_record("Суп"),
+            self.get_record("Суп", text="Другой суп"),
+        ])
+
+        stdout, _ = self.run_import()
+
+        self.assertEqual(Recipe.objects.filter(name="Суп").count(), 3)
+        self.assertIn("Загружено рецептов: 2", stdout)
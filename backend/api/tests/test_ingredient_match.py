@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class IngredientMatchTests(TestCase):
+    """
+    Подбор рецептов по имеющимся ингредиентам
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user(1)
+        cls.ingredients = create_ingredients(3)
+        cls.full = create_recipe(author, cls.ingredients[:1], name="Полный")
+        cls.partial = create_recipe(
+            author, cls.ingredients[:2], name="Частичный"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ids(self, match):
+        response = create_client().get(
+            "/api/recipes/",
+            {"ingredients": self.ingredients[0].pk, "match": match},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_best_orders_by_coverage(self):
+        self.assertEqual(
+            self.get_ids("best"), [self.full.pk, self.partial.pk]
+        )
+
+    def test_zero_ingredients_count(self):
+        Recipe.objects.filter(pk=self.full.pk).update(ingredients_count=0)
+
+        for match in ("best", "all"):
+            with self.subTest(match=match):
+                self.assertEqual(
+                    self.get_ids(match), [self.partial.pk, self.full.pk]
+                )
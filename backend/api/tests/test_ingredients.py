@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Ingredient
+
+
+class IngredientIndexVersionTests(TestCase):
+    """
+    Индекс ингредиентов перестраивается в каждом процессе,
+    когда другой процесс меняет версию каталога в общем кэше
+    """
+    def setUp(self):
+        cache.clear()
+        Ingredient.objects.create(name="соль", measurement_unit="г")
+
+    def get_names(self, **params):
+        response = self.client.get("/api/ingredients/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()], response["ETag"]
+
+    def test_change_from_other_process(self):
+        names, etag = self.get_names()
+        self.assertEqual(names, ["соль"])
+
+        # bulk_create не отправляет сигналы: изменение видит только
+        # процесс, который меняет версию, как load_db_food
+        Ingredient.objects.bulk_create(
+            [Ingredient(name="сахар", measurement_unit="г")]
+        )
+        IngredientIndex().invalidate()
+
+        names, new_etag = self.get_names()
+        self.assertEqual(names, ["сахар", "соль"])
+        self.assertNotEqual(new_etag, etag)
+
+    def test_search_by_name(self):
+        names, _ = self.get_names(name="со")
+        self.assertEqual(names, ["соль"])
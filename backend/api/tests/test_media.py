@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import cleanup
+from api.cleanup import drain_cleanup_queue, enqueue_files, run_cleanup
+from api.constants import GC_MEDIA_MIN_AGE
+from api.images import release_image
+from api.models import CleanupTask
+from .factories import MEDIA_ROOT, create_image
+
+OLD_MTIME = time.time() - 24 * 60 * 60
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+    """
+    Совпавший по содержимому файл не удаляется очисткой,
+    пока новая ссылка на него может быть не зафиксирована
+    """
+    def save_old_file(self, color):
+        name = default_storage.save("recipes/image.png", create_image(color))
+        os.utime(default_storage.path(name), (OLD_MTIME, OLD_MTIME))
+        return name
+
+    def test_duplicate_save_refreshes_mtime(self):
+        name = self.save_old_file("green")
+
+        duplicate = default_storage.save(
+            "recipes/other.png", create_image("green")
+        )
+
+        self.assertEqual(duplicate, name)
+        self.assertGreater(
+            os.path.getmtime(default_storage.path(name)), OLD_MTIME + 1
+        )
+        self.assertEqual(release_image(name), 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_release_old_unreferenced_file(self):
+        name = self.save_old_file("blue")
+
+        self.assertGreater(release_image(name), 0)
+        self.assertFalse(default_storage.exists(name))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CleanupQueueTests(TestCase):
+    """
+    Задачи удаления недавно сохраненных файлов откладываются,
+    а не теряются
+    """
+    def setUp(self):
+        self.name = default_storage.save(
+            "recipes/released.png", create_image("red")
+        )
+        enqueue_files([self.name])
+
+    def test_recent_file_postponed(self):
+        self.assertEqual(drain_cleanup_queue(), 0)
+
+        self.assertTrue(default_storage.exists(self.name))
+        task = CleanupTask.objects.get(target=self.name)
+        self.assertGreater(
+            task.run_after,
+            timezone.now() + timedelta(seconds=GC_MEDIA_MIN_AGE - 60),
+        )
+
+        os.utime(default_storage.path(self.name), (OLD_MTIME, OLD_MTIME))
+        CleanupTask.objects.update(run_after=timezone.now())
+
+        self.assertGreater(drain_cleanup_queue(), 0)
+        self.assertFalse(default_storage.exists(self.name))
+        self.assertFalse(CleanupTask.objects.exists())
+
+    def test_postponed_task_rescheduled(self):
+        # Закрытие соединений прервало бы транзакцию теста
+        with mock.patch.object(cleanup.connections, "close_all"):
+            with mock.patch("threading.Timer") as timer:
+                run_cleanup()
+
+        delay, callback = timer.call_args.args
+        self.assertGreater(delay, GC_MEDIA_MIN_AGE - 60)
+        self.assertIs(callback, cleanup.schedule_cleanup)
+        timer.return_value.start.assert_called_once()
+        cleanup.delayed_run = None
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import Favorite, ShoppingCart
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+RECIPES_COUNT = 12
+PAGE_LIMITS = (2, 10)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeQueriesTests(TestCase):
+    """
+    Число запросов к базе для списка и карточки рецепта
+    не зависит от размера страницы и числа ингредиентов
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(1)
+        ingredients = create_ingredients(3)
+        cls.recipes = [
+            create_recipe(create_user(index + 2), ingredients)
+            for index in range(RECIPES_COUNT)
+        ]
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        # Закэшированный ответ для анонимного пользователя
+        # обходится без запросов к базе
+        cache.clear()
+
+    def assert_list_queries(self, client, expected):
+        for limit in PAGE_LIMITS:
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = client.get(f"/api/recipes/?limit={limit}")
+                self.assertEqual(len(response.json()["results"]), limit)
+
+    def test_list_anonymous(self):
+        self.assert_list_queries(create_client(), 3)
+
+    def test_list_authenticated(self):
+        self.assert_list_queries(create_client(self.user), 5)
+
+    def test_retrieve_anonymous(self):
+        client = create_client()
+        with self.assertNumQueries(2):
+            response = client.get(f"/api/recipes/{self.recipes[0].pk}/")
+        self.assertEqual(len(response.json()["ingredients"]), 3)
+
+    def test_retrieve_authenticated(self):
+        client = create_client(self.user)
+        with self.assertNumQueries(4):
+            response = client.get(f"/api/recipes/{self.recipes[0].pk}/")
+        self.assertTrue(response.json()["is_favorited"])
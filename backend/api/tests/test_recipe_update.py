@@ -0,0 +1,81 @@
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredients
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeIngredientsUpdateTests(TestCase):
+    """
+    Обновление рецепта меняет только изменившиеся ингредиенты,
+    не удаляя и не создавая заново остальные
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.ingredients = create_ingredients(20)
+
+    def patch_one_amount(self, ingredients_count):
+        """
+        Меняет количество одного ингредиента в рецепте.
+        Возвращает запросы к базе, выполненные при обновлении
+        """
+        recipe = create_recipe(
+            self.author, self.ingredients[:ingredients_count]
+        )
+        rows = dict(
+            recipe.ingredient_items.values_list("ingredient", "pk")
+        )
+        payload = {
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "ingredients": [
+                {"id": ingredient_id, "amount": 10}
+                for ingredient_id in rows
+            ],
+        }
+        payload["ingredients"][0]["amount"] = 25
+        client = create_client(self.author)
+        with CaptureQueriesContext(connection) as context:
+            response = client.patch(
+                f"/api/recipes/{recipe.pk}/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            dict(recipe.ingredient_items.values_list("ingredient", "pk")),
+            rows,
+        )
+        changed = payload["ingredients"][0]["id"]
+        self.assertEqual(
+            RecipeIngredients.objects.get(pk=rows[changed]).amount, 25
+        )
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_unchanged_rows_kept(self):
+        table = RecipeIngredients._meta.db_table
+        for query in self.patch_one_amount(5):
+            self.assertNotRegex(
+                query, rf'^(DELETE FROM|INSERT INTO) "?{table}"?'
+            )
+
+    def test_queries_do_not_depend_on_ingredients_count(self):
+        self.assertEqual(
+            len(self.patch_one_amount(3)), len(self.patch_one_amount(20))
+        )
+
+    def test_duplicate_ingredient_rejected(self):
+        recipe = create_recipe(self.author, self.ingredients[:1])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=self.ingredients[0], amount=5
+            )
@@ -0,0 +1,96 @@
+from django.test import Client, TestCase, override_settings
+
+from recipes.models import ShoppingCart, ShoppingCartIngredient
+from recipes.shopping_totals import find_shopping_totals_mismatches
+from users.models import User
+from .factories import (
+    MEDIA_ROOT,
+    create_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ShoppingTotalsSignalsTests(TestCase):
+    """
+    Суммы списков покупок обновляются при изменениях не только
+    через API, но и через админку и ORM
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.buyer = create_user(2)
+        cls.ingredients = create_ingredients(3)
+
+    def setUp(self):
+        self.recipe = create_recipe(self.author, self.ingredients[:2])
+        response = create_client(self.buyer).post(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def assertTotals(self, expected):
+        self.assertEqual(
+            dict(ShoppingCartIngredient.objects.filter(
+                user=self.buyer
+            ).values_list("ingredient", "amount")),
+            {
+                self.ingredients[index].pk: amount
+                for index, amount in expected.items()
+            },
+        )
+        self.assertEqual(list(find_shopping_totals_mismatches()), [])
+
+    def test_admin_inline_edit(self):
+        admin_user = User.objects.create_superuser(
+            email="admin@example.com",
+            username="admin",
+            password="password-1234",
+        )
+        client = Client()
+        client.force_login(admin_user)
+        first, second = self.recipe.ingredient_items.order_by("pk")
+        prefix = "ingredient_items"
+
+        response = client.post(
+            f"/admin/recipes/recipe/{self.recipe.pk}/change/",
+            {
+                "name": self.recipe.name,
+                "text": self.recipe.text,
+                "cooking_time": self.recipe.cooking_time,
+                "author": self.author.pk,
+                f"{prefix}-TOTAL_FORMS": 3,
+                f"{prefix}-INITIAL_FORMS": 2,
+                f"{prefix}-MIN_NUM_FORMS": 0,
+                f"{prefix}-MAX_NUM_FORMS": 1000,
+                f"{prefix}-0-id": first.pk,
+                f"{prefix}-0-recipe": self.recipe.pk,
+                f"{prefix}-0-ingredient": first.ingredient_id,
+                f"{prefix}-0-amount": 25,
+                f"{prefix}-1-id": second.pk,
+                f"{prefix}-1-recipe": self.recipe.pk,
+                f"{prefix}-1-ingredient": second.ingredient_id,
+                f"{prefix}-1-amount": second.amount,
+                f"{prefix}-1-DELETE": "on",
+                f"{prefix}-2-recipe": self.recipe.pk,
+                f"{prefix}-2-ingredient": self.ingredients[2].pk,
+                f"{prefix}-2-amount": 5,
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTotals({0: 25, 2: 5})
+
+    def test_orm_shopping_cart_changes(self):
+        other = create_recipe(self.author, self.ingredients[1:])
+        relation = ShoppingCart.objects.create(user=self.buyer, recipe=other)
+        self.assertTotals({0: 10, 1: 20, 2: 10})
+
+        relation.delete()
+        self.assertTotals({0: 10, 1: 10})
+
+    def test_recipe_deleted(self):
+        self.recipe.delete()
+        self.assertTotals({})
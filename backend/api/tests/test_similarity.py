@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.models import Recipe, SimilarRecipe
+from recipes.similarity import build_similar_recipes
+from .factories import (
+    MEDIA_ROOT,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SimilarRecipesTests(TestCase):
+    """
+    Пересчет похожих рецептов только для измененных рецептов
+    """
+    def setUp(self):
+        author = create_user(1)
+        ingredients = create_ingredients(3)
+        self.recipe = create_recipe(author, ingredients[:2], name="Первый")
+        self.deleted = create_recipe(author, ingredients, name="Второй")
+        self.other = create_recipe(author, ingredients[1:], name="Третий")
+        build_similar_recipes(timezone.now(), full=True, count=1)
+
+    def get_similar(self, recipe):
+        return list(SimilarRecipe.objects.filter(
+            recipe=recipe
+        ).order_by("-score", "similar").values_list("similar", flat=True))
+
+    def test_deleted_recipe_replaced(self):
+        self.assertEqual(
+            self.get_similar(self.recipe), [self.deleted.pk]
+        )
+
+        self.deleted.delete()
+        self.assertIsNone(
+            Recipe.objects.get(pk=self.recipe.pk).similar_computed_at
+        )
+        self.assertEqual(build_similar_recipes(timezone.now(), count=1), 2)
+
+        self.assertEqual(self.get_similar(self.recipe), [self.other.pk])
+        self.assertEqual(self.get_similar(self.other), [self.recipe.pk])
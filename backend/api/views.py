@@ -1,9 +1,11 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Value
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
@@ -11,28 +13,56 @@ from rest_framework.permissions import (
 from rest_framework.response import Response
 from djoser.views import UserViewSet
 
+from recipes.counters import delete_counted
+from recipes.feed import add_to_feed, get_feed_keys, remove_from_feed
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredients,
     ShoppingCart,
+    ShoppingCartIngredient,
 )
 from users.models import Subscription, User
+from .bulk import add_relations, get_bulk_results, remove_relations
+from .cache import (
+    bump_relations_versions,
+    cache_anonymous_response,
+    conditional_response,
+    get_catalog_validators,
+    get_ingredients_validators,
+)
+from .cleanup import enqueue_user
 from .constants import (
     ACTION_TYPE_ADD,
     ACTION_TYPE_REMOVE,
+    BULK_STATUS_ADDED,
+    BULK_STATUS_ALREADY_ADDED,
+    BULK_STATUS_NOT_ADDED,
+    BULK_STATUS_REMOVED,
+    BULK_STATUS_SELF,
     ERROR_ALREADY_SUBSCRIBED,
     ERROR_AVATAR_EMPTY,
     ERROR_NOT_SUBSCRIBED,
     ERROR_RECIPE_ALREADY_ADDED,
     ERROR_RECIPE_NOT_FOUND,
     ERROR_SELF_SUBSCRIBE,
+    RECIPES_LIMIT_QUERY_PARAM,
+    SHOPPING_CART_BREAKDOWN_QUERY_PARAM,
+    SHOPPING_CART_EXPORT_CHUNK_SIZE,
+    SHOPPING_CART_FILENAME,
 )
-from .filters import IngredientFilter, RecipeFilter
+from .filters import RecipeFilter
 from .pagination import LimitPagination
 from .permissions import IsAdminAuthorOrReadOnly
+from .renderers import (
+    ShoppingCartCSVRenderer,
+    ShoppingCartJSONRenderer,
+    ShoppingCartTextRenderer,
+)
 from .serializers import (
+    BulkIdsSerializer,
     IngredientSerializer,
     RecipeCreateUpdateSerializer,
     RecipeSerializer,
@@ -49,11 +79,56 @@ class AppUserViewSet(UserViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = LimitPagination
 
+    @conditional_response(get_catalog_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(get_catalog_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        """
+        Сразу отключает пользователя, а его рецепты, связи и файлы
+        удаляются пачками в фоне
+        """
+        with transaction.atomic():
+            instance.is_active = False
+            instance.save(update_fields=["is_active"])
+            enqueue_user(instance.pk)
+
+    def get_subscribed_authors(self, authors):
+        """
+        Помечает авторов из подписок и подгружает первые recipes_limit
+        рецептов каждого автора одним оконным запросом
+        """
+        recipes_limit = self.request.query_params.get(
+            RECIPES_LIMIT_QUERY_PARAM
+        )
+        try:
+            recipes_limit = (int(recipes_limit) if recipes_limit is not None
+                             else None)
+        except ValueError:
+            recipes_limit = None
+
+        recipes = Recipe.objects.all()
+        if recipes_limit:
+            recipes = recipes[:recipes_limit]
+
+        return authors.annotate(
+            is_subscribed=Value(True),
+        ).order_by(
+            "id",
+        ).prefetch_related(
+            Prefetch("recipes", queryset=recipes, to_attr="limited_recipes")
+        )
+
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
     )
+    @conditional_response(get_catalog_validators)
     def me(self, request):
         """
         Получить информацию о пользователе
@@ -65,12 +140,13 @@ class AppUserViewSet(UserViewSet):
         methods=("get",),
         permission_classes=(IsAuthenticated,),
     )
+    @conditional_response(get_catalog_validators)
     def subscriptions(self, request):
         """
         Получить список авторов, на которых подписан пользователь
         """
-        subscribed_authors = User.objects.filter(
-            author__user=self.request.user,
+        subscribed_authors = self.get_subscribed_authors(
+            User.objects.filter(author__user=self.request.user)
         )
         pages = self.paginate_queryset(subscribed_authors)
         serializer = UserSubscriptionSerializer(
@@ -87,51 +163,92 @@ class AppUserViewSet(UserViewSet):
         Подписаться или отписаться от автора
         """
         user = self.request.user
-        author = get_object_or_404(User, pk=id)
 
-        if user == author:
+        if str(user.pk) == str(id):
             return Response(
                 {"detail": ERROR_SELF_SUBSCRIBE},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         if self.request.method == "POST":
-            if Subscription.objects.filter(user=user, author=author).exists():
+            author = get_object_or_404(
+                self.get_subscribed_authors(User.objects.filter(pk=id))
+            )
+            try:
+                with transaction.atomic():
+                    Subscription.objects.create(author=author, user=user)
+            except IntegrityError:
                 return Response(
                     {"detail": ERROR_ALREADY_SUBSCRIBED},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            Subscription.objects.create(author=author, user=user)
             serializer = UserSubscriptionSerializer(
                 author, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if self.request.method == "DELETE":
-            if not Subscription.objects.filter(
+            deleted = delete_counted(Subscription.objects.filter(
                 user=user,
-                author=author,
-            ).exists():
+                author=id,
+            ))
+            if not deleted:
+                get_object_or_404(User, pk=id)
                 return Response(
                     {"detail": ERROR_NOT_SUBSCRIBED},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            subscription = get_object_or_404(
-                Subscription, user=user, author=author
-            )
-            subscription.delete()
-
+            remove_from_feed(user.pk, deleted.values())
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_subscribe(self, request):
+        """
+        Подписаться или отписаться от нескольких авторов сразу
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        user = request.user
+
+        found = set(
+            User.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        authors = [pk for pk in ids if pk in found and pk != user.pk]
+        with transaction.atomic():
+            if request.method == "POST":
+                changed = add_relations(Subscription, user, "author", authors)
+                add_to_feed(user.pk, changed)
+                statuses = (BULK_STATUS_ADDED, BULK_STATUS_ALREADY_ADDED)
+            else:
+                changed = remove_relations(
+                    Subscription, user, "author", authors
+                )
+                remove_from_feed(user.pk, changed)
+                statuses = (BULK_STATUS_REMOVED, BULK_STATUS_NOT_ADDED)
+            if changed:
+                transaction.on_commit(
+                    lambda: bump_relations_versions(user.pk)
+                )
+
+        results = get_bulk_results(ids, changed, found, *statuses)
+        for result in results:
+            if result["id"] == user.pk:
+                result["status"] = BULK_STATUS_SELF
+        return Response({"results": results})
+
     @action(
         detail=False,
         methods=["put", "delete"],
         url_path="me/avatar",
         permission_classes=[IsAuthenticated],
+        parser_classes=[JSONParser, MultiPartParser, FormParser],
     )
     def update_avatar(self, request):
         """
@@ -159,7 +276,9 @@ class AppUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         elif request.method == "DELETE":
-            user.avatar.delete(save=True)
+            # Файл удаляется сигналом, если на него больше никто не ссылается
+            user.avatar = None
+            user.save(update_fields=["avatar"])
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -171,9 +290,29 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
-    search_fields = ('^name',)
+
+    @conditional_response(get_ingredients_validators)
+    def list(self, request, *args, **kwargs):
+        """
+        Отдает ингредиенты из индекса в памяти, без запроса к базе
+        """
+        name = request.query_params.get("name")
+        if name:
+            return Response(ingredient_index.search(name))
+        return Response(ingredient_index.all())
+
+    @conditional_response(get_ingredients_validators)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Отдает ингредиент из индекса в памяти, без запроса к базе
+        """
+        try:
+            ingredient = ingredient_index.get(int(kwargs["pk"]))
+        except ValueError:
+            ingredient = None
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -185,6 +324,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = LimitPagination
+    # Изображение можно передать строкой base64 в JSON
+    # или файлом в multipart/form-data
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+
+    def get_queryset(self):
+        """
+        Для чтения рецептов подгружает связанные данные и статусы
+        пользователя одним набором запросов, независимо от размера страницы
+        """
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve", "feed"):
+            return queryset.with_user_relations(self.request.user)
+        return queryset
+
+    @conditional_response(get_catalog_validators)
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(get_catalog_validators)
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_serializer_class(self):
         """
@@ -199,30 +361,66 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Сохраняет автора рецепта при создании."""
         serializer.save(author=self.request.user)
 
-    def _handle_recipe_relation(self, model, user, recipe, action_type):
+    def _handle_recipe_relation(self, model, user, pk, action_type):
         """
-        Обрабатывает добавление/удаление связи между пользователем и рецептом
+        Обрабатывает добавление/удаление связи между пользователем и рецептом.
+        Наличие связи определяют уникальное ограничение при вставке
+        и число удаленных строк, поэтому повторные параллельные запросы
+        получают 400, а не ошибку сервера
         """
-        relation = model.objects.filter(user=user, recipe=recipe)
-
         if action_type == ACTION_TYPE_ADD:
-            if relation.exists():
+            recipe = get_object_or_404(Recipe, pk=pk)
+            try:
+                with transaction.atomic():
+                    model.objects.create(user=user, recipe=recipe)
+            except IntegrityError:
                 return Response(
                     {"detail": ERROR_RECIPE_ALREADY_ADDED},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            model.objects.create(user=user, recipe=recipe)
             serializer = ShortRecipeSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if not relation.exists():
+        deleted = delete_counted(model.objects.filter(user=user, recipe=pk))
+        if not deleted:
+            get_object_or_404(Recipe, pk=pk)
             return Response(
                 {"detail": ERROR_RECIPE_NOT_FOUND},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        relation.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def _handle_bulk_recipe_relation(self, model, request):
+        """
+        Добавляет или удаляет связи пользователя с несколькими рецептами
+        в одной транзакции, возвращая результат для каждого рецепта
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        user = request.user
+
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        recipes = [pk for pk in ids if pk in found]
+        with transaction.atomic():
+            if request.method == "POST":
+                changed = add_relations(model, user, "recipe", recipes)
+                statuses = (BULK_STATUS_ADDED, BULK_STATUS_ALREADY_ADDED)
+            else:
+                changed = remove_relations(model, user, "recipe", recipes)
+                statuses = (BULK_STATUS_REMOVED, BULK_STATUS_NOT_ADDED)
+            if changed:
+                # bulk_create не отправляет сигналы
+                transaction.on_commit(
+                    lambda: bump_relations_versions(user.pk)
+                )
+
+        return Response({
+            "results": get_bulk_results(ids, changed, found, *statuses)
+        })
+
     @action(
         detail=True,
         methods=("post", "delete"),
@@ -233,11 +431,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Добавляет или удаляет рецепт из избранного
         """
-        recipe = get_object_or_404(Recipe, pk=pk)
         action_type = (ACTION_TYPE_ADD if request.method == "POST"
                        else ACTION_TYPE_REMOVE)
         return self._handle_recipe_relation(
-            Favorite, request.user, recipe, action_type
+            Favorite, request.user, pk, action_type
         )
 
     @action(
@@ -250,12 +447,76 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Добавляет или удаляет рецепт из списка покупок
         """
-        recipe = get_object_or_404(Recipe, pk=pk)
         action_type = (ACTION_TYPE_ADD if request.method == "POST"
                        else ACTION_TYPE_REMOVE)
         return self._handle_recipe_relation(
-            ShoppingCart, request.user, recipe, action_type
+            ShoppingCart, request.user, pk, action_type
+        )
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_favorite(self, request):
+        """
+        Добавляет или удаляет несколько рецептов из избранного
+        """
+        return self._handle_bulk_recipe_relation(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_shopping_cart(self, request):
+        """
+        Добавляет или удаляет несколько рецептов из списка покупок
+        """
+        return self._handle_bulk_recipe_relation(ShoppingCart, request)
+
+    @action(
+        detail=True,
+        methods=("get",),
+    )
+    @conditional_response(get_catalog_validators)
+    @cache_anonymous_response
+    def similar(self, request, pk=None):
+        """
+        Рецепты, похожие на данный по набору ингредиентов,
+        из таблицы, которую заполняет команда build_similar_recipes
+        """
+        recipes = Recipe.objects.filter(
+            similar_to__recipe=pk
+        ).order_by("-similar_to__score", "id")
+        serializer = ShortRecipeSerializer(
+            recipes, many=True, context={"request": request}
         )
+        if not serializer.data:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(IsAuthenticated,),
+    )
+    @conditional_response(get_catalog_validators)
+    def feed(self, request):
+        """
+        Последние рецепты авторов, на которых подписан пользователь.
+        Всегда отдается курсорными страницами
+        """
+        recipes = self.paginator.paginate_keys(
+            request,
+            self.get_queryset(),
+            ("-pub_date", "-id"),
+            lambda position, limit: get_feed_keys(
+                request.user, position, limit
+            ),
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
@@ -263,37 +524,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
         url_path="download_shopping_cart",
         url_name="download_shopping_cart",
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
         """
-        Скачивает список покупок в текстовый файл
+        Скачивает список покупок в формате txt, csv или json (?format=).
+        Суммы читаются из поддерживаемой таблицы ShoppingCartIngredient,
+        файл формируется по мере чтения строк из базы, с ?breakdown=1
+        добавляется разбивка по рецептам
         """
-        ingredients = (
-            RecipeIngredients.objects.filter(
-                recipe__shopping_list__user=request.user,
+        totals = (
+            ShoppingCartIngredient.objects.filter(
+                user=request.user,
             ).values(
                 'ingredient__name',
                 'ingredient__measurement_unit',
-            ).annotate(
-                total_amount=Sum('amount'),
+                total_amount=F('amount'),
             ).order_by(
                 'ingredient__name',
             )
-        )
+        ).iterator(chunk_size=SHOPPING_CART_EXPORT_CHUNK_SIZE)
 
-        purchased = ["Список ваших покупок:"]
-        for item in ingredients:
-            purchased.append(
-                f"{item['ingredient__name']} "
-                f"({item['ingredient__measurement_unit']})"
-                f" — {item['total_amount']}"
+        try:
+            # Пустое значение отключает разбивку, как и false/0
+            with_breakdown = serializers.BooleanField(
+                allow_null=True
+            ).to_internal_value(request.query_params.get(
+                SHOPPING_CART_BREAKDOWN_QUERY_PARAM
+            ))
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError(
+                {SHOPPING_CART_BREAKDOWN_QUERY_PARAM: error.detail}
             )
 
-        response = HttpResponse(
-            "\n".join(purchased), content_type="text/plain"
+        breakdown = None
+        if with_breakdown:
+            breakdown = (
+                RecipeIngredients.objects.filter(
+                    recipe__shopping_list__user=request.user,
+                ).values(
+                    'recipe_id',
+                    'recipe__name',
+                    'ingredient__name',
+                    'ingredient__measurement_unit',
+                    'amount',
+                ).order_by(
+                    'recipe__name',
+                    'recipe_id',
+                    'ingredient__name',
+                )
+            ).iterator(chunk_size=SHOPPING_CART_EXPORT_CHUNK_SIZE)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(totals, breakdown),
+            content_type=f"{renderer.media_type}; charset=utf-8",
         )
         response["Content-Disposition"] = (
-            "attachment; filename=purchased_cart.txt"
+            f"attachment; filename={SHOPPING_CART_FILENAME}.{renderer.format}"
         )
         return response
 
@@ -2,7 +2,10 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 
+from api.constants import MEDIA_CACHE_MAX_AGE
 from recipes.views import short_link_redirect_view
 
 urlpatterns = [
@@ -12,6 +15,18 @@ urlpatterns = [
 ]
 
 
+def serve_media(request, path, document_root=None):
+    """
+    Отдает медиафайлы в режиме отладки с теми же заголовками, что nginx
+    """
+    response = serve(request, path, document_root=document_root)
+    patch_cache_control(
+        response, public=True, max_age=MEDIA_CACHE_MAX_AGE, immutable=True
+    )
+    return response
+
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
+                          view=serve_media,
                           document_root=settings.MEDIA_ROOT)
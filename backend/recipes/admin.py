@@ -1,6 +1,6 @@
 from django.contrib import admin
-from django.db.models import Count
 
+from recipes.counters import delete_counted
 from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredients
 
 
@@ -11,28 +11,29 @@ class RecipeIngredientsInLine(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "author", "pub_date", "favorite_count")
+    list_display = (
+        "id",
+        "name",
+        "author",
+        "pub_date",
+        "favorites_count",
+        "shopping_count",
+    )
     search_fields = ("name", "author__username", "author__email")
     list_filter = ("pub_date",)
+    readonly_fields = (
+        "favorites_count",
+        "shopping_count",
+        "ingredients_count",
+        "trending_score",
+    )
     inlines = (RecipeIngredientsInLine,)
 
-    def get_queryset(self, request):
+    def delete_queryset(self, request, queryset):
         """
-        Переопределение queryset для добавления подсчета избранных
+        Групповое удаление с уменьшением счетчиков авторов
         """
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(
-            _favorite_count=Count("favorite", distinct=True)
-        )
-        return queryset
-
-    def favorite_count(self, obj):
-        """
-        Отображение количества добавлений рецепта в избранное
-        """
-        return obj._favorite_count
-    favorite_count.admin_order_field = '_favorite_count'
-    favorite_count.short_description = 'В избранном'
+        delete_counted(queryset)
 
 
 @admin.register(Ingredient)
@@ -44,5 +45,11 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "recipe")
+    list_display = ("id", "user", "recipe", "created_at")
     search_fields = ("user__username", "recipe__name")
+
+    def delete_queryset(self, request, queryset):
+        """
+        Групповое удаление с уменьшением счетчиков рецептов
+        """
+        delete_counted(queryset)
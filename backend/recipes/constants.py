@@ -5,9 +5,65 @@ MEASUREMENT_UNIT_DEFAULT = "g"
 RECIPE_NAME_MAX_LENGTH = 200
 
 COOKING_TIME_MIN_VALUE = 1
+# Наибольшее значение PositiveSmallIntegerField
+SMALL_INTEGER_MAX_VALUE = 32767
 COOKING_TIME_MIN_VALUE_ERROR_MESSAGE = (
     "Время приготовления не может быть меньше 1"
 )
 AMOUNT_MIN_VALUE_ERROR_MESSAGE = "Не может быть меньше 1"
 
 RECIPE_IMAGE_UPLOAD_TO = "recipes/"
+
+INGREDIENT_INDEX_TTL = 300
+INGREDIENT_INDEX_VERSION_CACHE_KEY = "ingredients:index_version"
+INGREDIENT_SEARCH_LIMIT = 50
+
+SHOPPING_TOTALS_BATCH_SIZE = 1000
+
+DATA_IMPORT_SOURCE_MAX_LENGTH = 255
+DATA_IMPORT_CHECKSUM_MAX_LENGTH = 64
+DATA_FILE_CHUNK_SIZE = 64 * 1024
+INGREDIENTS_LOAD_BATCH_SIZE = 1000
+
+SEARCH_CONFIG = "russian"
+SEARCH_FTS_TABLE = "recipes_recipe_fts"
+SEARCH_NAME_WEIGHT = 10.0
+SEARCH_TEXT_WEIGHT = 1.0
+SEARCH_SNIPPET_START = "<mark>"
+SEARCH_SNIPPET_STOP = "</mark>"
+SEARCH_SNIPPET_ELLIPSIS = "…"
+SEARCH_SNIPPET_WORDS = 24
+
+INGREDIENTS_MATCH_ALL = "all"
+INGREDIENTS_MATCH_ANY = "any"
+INGREDIENTS_MATCH_BEST = "best"
+INGREDIENTS_MATCH_CHOICES = (
+    (INGREDIENTS_MATCH_ALL, "Все ингредиенты"),
+    (INGREDIENTS_MATCH_ANY, "Хотя бы один ингредиент"),
+    (INGREDIENTS_MATCH_BEST, "Лучшее совпадение"),
+)
+INGREDIENTS_MATCH_MAX_IDS = 50
+
+FEED_FANOUT_MAX_SUBSCRIBERS = 1000
+FEED_BACKFILL_SIZE = 50
+FEED_BATCH_SIZE = 1000
+
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_RECIPES_CHUNK_PAIRS = 10000000
+SIMILAR_RECIPES_LOAD_BATCH_SIZE = 100000
+SIMILAR_RECIPES_BATCH_SIZE = 1000
+
+RECIPES_ORDERING_POPULAR = "popular"
+RECIPES_ORDERING_TRENDING = "trending"
+RECIPES_ORDERING_CHOICES = (
+    (RECIPES_ORDERING_POPULAR, "Популярные"),
+    (RECIPES_ORDERING_TRENDING, "Набирающие популярность"),
+)
+# 2025-01-01 00:00 UTC
+TRENDING_EPOCH = 1735689600
+TRENDING_HALF_LIFE = 2 * 24 * 60 * 60
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+TRENDING_CUTOFF_HALF_LIVES = 30
+TRENDING_SCORE_PRECISION = 1e-9
+TRENDING_BATCH_SIZE = 1000
@@ -0,0 +1,99 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription, User
+from .models import Favorite, Recipe, RecipeIngredients, ShoppingCart
+from .shopping_totals import (
+    DELETED_ROW_FIELDS,
+    remove_deleted_from_shopping_totals,
+)
+from .trending import TRENDING_WEIGHTS, remove_trending_events
+
+# Модель, строки которой считаются:
+# (модель со счетчиком, поле ссылки на нее, поле счетчика)
+COUNTERS = {
+    Favorite: (Recipe, "recipe", "favorites_count"),
+    ShoppingCart: (Recipe, "recipe", "shopping_count"),
+    RecipeIngredients: (Recipe, "recipe", "ingredients_count"),
+    Recipe: (User, "author", "recipes_count"),
+    Subscription: (User, "author", "subscribers_count"),
+}
+
+
+def change_counters(model, deltas):
+    """
+    Изменяет счетчики объектов на deltas ({id объекта: изменение}).
+    Объекты с одинаковым изменением обновляются одним UPDATE
+    """
+    counter_model, _, field = COUNTERS[model]
+    ids_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(pk)
+    for delta, ids in ids_by_delta.items():
+        counter_model.objects.filter(pk__in=ids).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def increment_counters(model, ids):
+    """
+    Учитывает созданные строки model, ссылающиеся на объекты ids
+    """
+    change_counters(model, Counter(ids))
+
+
+def delete_counted(queryset):
+    """
+    Удаляет строки queryset и уменьшает счетчики, которые они увеличивали.
+    Удаление через queryset сигнал для счетчиков пропускает, поэтому
+    все такие удаления должны идти через эту функцию.
+    Вклад строк в оценки популярности и суммы списков покупок
+    тоже вычитается.
+    Строки блокируются и удаляются в одной транзакции
+    вместе с изменением счетчиков.
+    Возвращает {id строки: id объекта со счетчиком}
+    """
+    model = queryset.model
+    _, field, _ = COUNTERS[model]
+    target = f"{field}_id"
+    fields = {"pk", target, *DELETED_ROW_FIELDS.get(model, ())}
+    if model in TRENDING_WEIGHTS:
+        fields.add("created_at")
+    with transaction.atomic():
+        values = list(queryset.select_for_update().values(*fields))
+        rows = {row["pk"]: row[target] for row in values}
+        if rows:
+            model.objects.filter(pk__in=rows).delete()
+            change_counters(model, {
+                pk: -count for pk, count in Counter(rows.values()).items()
+            })
+            if model in TRENDING_WEIGHTS:
+                remove_trending_events(model, (
+                    (row[target], row["created_at"]) for row in values
+                ))
+            remove_deleted_from_shopping_totals(model, values)
+    return rows
+
+
+def recount_counters():
+    """
+    Пересчитывает все счетчики по фактическим строкам
+    """
+    targets = defaultdict(dict)
+    for model, (counter_model, field, counter) in COUNTERS.items():
+        targets[counter_model][counter] = Coalesce(
+            Subquery(
+                model.objects.filter(
+                    **{field: OuterRef("pk")}
+                ).order_by().values(field).annotate(
+                    total=Count("pk")
+                ).values("total")
+            ),
+            0,
+        )
+    for counter_model, counters in targets.items():
+        counter_model.objects.update(**counters)
@@ -0,0 +1,67 @@
+import csv
+import hashlib
+import json
+
+from .constants import DATA_FILE_CHUNK_SIZE
+
+
+def get_checksum(path):
+    """
+    SHA-256 содержимого файла, читаемого по частям
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(DATA_FILE_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_record_checksum(record):
+    """
+    SHA-256 записи JSON, не зависящий от порядка ключей
+    """
+    return hashlib.sha256(
+        json.dumps(record, ensure_ascii=False, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def iter_csv_rows(file):
+    """
+    Строки CSV без пустых
+    """
+    for row in csv.reader(file):
+        if row:
+            yield row
+
+
+def iter_json_objects(file):
+    """
+    Объекты из JSON-массива или из файла с объектом на каждой строке.
+    Файл читается по частям, в памяти держится один объект
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    exhausted = False
+    while True:
+        # Пропускаем пробелы и разделители между объектами массива
+        while position < len(buffer) and buffer[position] in " \t\r\n[],":
+            position += 1
+        if position == len(buffer):
+            if exhausted:
+                return
+            buffer, position = file.read(DATA_FILE_CHUNK_SIZE), 0
+            exhausted = not buffer
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            # Объект не поместился в буфер целиком
+            chunk = file.read(DATA_FILE_CHUNK_SIZE)
+            exhausted = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield value
+        position = end
@@ -0,0 +1,134 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Subscription, User
+from .constants import (
+    FEED_BACKFILL_SIZE,
+    FEED_BATCH_SIZE,
+    FEED_FANOUT_MAX_SUBSCRIBERS,
+)
+from .models import FeedEntry, Recipe
+
+
+def create_entries(entries):
+    """
+    Создает записи ленты пачками, не собирая их все в памяти.
+    Уже существующие записи пропускаются
+    """
+    entries = iter(entries)
+    while batch := list(islice(entries, FEED_BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_recipes(recipes):
+    """
+    Добавляет новые рецепты в ленты подписчиков их авторов.
+    Авторы, у которых подписчиков не меньше порога, помечаются
+    флагом feed_pull: их рецепты читаются при запросе ленты
+    """
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    authors = dict(User.objects.filter(
+        pk__in=by_author, feed_pull=False
+    ).values_list("pk", "subscribers_count"))
+    popular = [
+        pk for pk, subscribers in authors.items()
+        if subscribers >= FEED_FANOUT_MAX_SUBSCRIBERS
+    ]
+    if popular:
+        User.objects.filter(pk__in=popular).update(feed_pull=True)
+    subscriptions = Subscription.objects.filter(
+        author__in=authors.keys() - set(popular)
+    ).values_list("user", "author")
+    create_entries(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe.pk,
+            author_id=author_id,
+            pub_date=recipe.pub_date,
+        )
+        for user_id, author_id in subscriptions.iterator(
+            chunk_size=FEED_BATCH_SIZE
+        )
+        for recipe in by_author[author_id]
+    )
+
+
+def add_to_feed(user_id, author_ids):
+    """
+    Добавляет в ленту подписчика последние рецепты новых авторов
+    """
+    recipes = Recipe.objects.filter(
+        author__in=author_ids, author__feed_pull=False
+    ).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F("author"),
+            order_by=(F("pub_date").desc(), F("id").desc()),
+        ),
+    ).filter(
+        position__lte=FEED_BACKFILL_SIZE,
+    ).values_list("pk", "author", "pub_date")
+    create_entries(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for recipe_id, author_id, pub_date in recipes
+    )
+
+
+def remove_from_feed(user_id, author_ids):
+    """
+    Удаляет из ленты подписчика рецепты авторов, от которых он отписался
+    """
+    FeedEntry.objects.filter(user=user_id, author__in=author_ids).delete()
+
+
+def seek(queryset, position, id_field):
+    """
+    Строки queryset строго после позиции (pub_date, id)
+    в порядке убывания
+    """
+    queryset = queryset.order_by("-pub_date", f"-{id_field}")
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f"{id_field}__lt": pk})
+    )
+
+
+def get_feed_keys(user, position, limit):
+    """
+    Ключи (pub_date, id рецепта) следующих limit рецептов ленты после
+    позиции. Записи ленты читаются одним диапазоном индекса, рецепты
+    авторов с флагом feed_pull - по индексу рецептов автора,
+    затем обе последовательности сливаются
+    """
+    pulled = list(Subscription.objects.filter(
+        user=user, author__feed_pull=True
+    ).values_list("author", flat=True))
+    entries = FeedEntry.objects.filter(user=user)
+    if pulled:
+        entries = entries.exclude(author__in=pulled)
+    keys = list(
+        seek(entries, position, "recipe_id").values_list(
+            "pub_date", "recipe"
+        )[:limit]
+    )
+    if not pulled:
+        return keys
+    recipes = list(
+        seek(Recipe.objects.filter(author__in=pulled), position, "id")
+        .values_list("pub_date", "id")[:limit]
+    )
+    return list(islice(heapq.merge(keys, recipes, reverse=True), limit))
@@ -0,0 +1,146 @@
+import bisect
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+
+from .constants import (
+    INGREDIENT_INDEX_TTL,
+    INGREDIENT_INDEX_VERSION_CACHE_KEY,
+    INGREDIENT_SEARCH_LIMIT,
+)
+
+
+def normalize(value):
+    """
+    Ключ для поиска: без учета регистра и различия между "е" и "ё"
+    """
+    return value.strip().casefold().replace("ё", "е")
+
+
+class IngredientIndex:
+    """
+    Отсортированный индекс каталога ингредиентов в памяти процесса.
+    Строится лениво при первом обращении. Версия каталога хранится
+    в общем кэше: сигналы Ingredient и load_db_food меняют ее,
+    и каждый процесс перестраивает индекс при следующем обращении.
+    Без общего кэша индекс перестраивается не реже, чем раз в ttl секунд
+    """
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def version(self):
+        """
+        Текущая версия каталога — время последнего изменения
+        в микросекундах
+        """
+        version = cache.get(INGREDIENT_INDEX_VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(
+                INGREDIENT_INDEX_VERSION_CACHE_KEY,
+                time.time_ns() // 1000,
+                timeout=None,
+            )
+            version = cache.get(INGREDIENT_INDEX_VERSION_CACHE_KEY)
+        return version
+
+    def invalidate(self):
+        """
+        Меняет версию каталога во всех процессах и сбрасывает индекс,
+        следующий запрос построит его заново
+        """
+        cache.set(
+            INGREDIENT_INDEX_VERSION_CACHE_KEY,
+            max(time.time_ns() // 1000, self.version() + 1),
+            timeout=None,
+        )
+        self._snapshot = None
+
+    def all(self):
+        """
+        Весь каталог в порядке названий
+        """
+        return self._get_snapshot()["rows"]
+
+    def digest(self):
+        """
+        Хэш содержимого каталога, одинаковый во всех процессах
+        """
+        return self._get_snapshot()["digest"]
+
+    def get(self, pk):
+        """
+        Ингредиент по id или None
+        """
+        return self._get_snapshot()["by_id"].get(pk)
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        """
+        Ищет ингредиенты по названию: сначала точное совпадение,
+        затем совпадение по началу, затем по вхождению подстроки
+        """
+        snapshot = self._get_snapshot()
+        keys, rows = snapshot["keys"], snapshot["rows"]
+        key = normalize(query)
+        if not key:
+            return rows[:limit]
+
+        results = []
+        position = bisect.bisect_left(keys, key)
+        while (
+            position < len(keys)
+            and len(results) < limit
+            and keys[position].startswith(key)
+        ):
+            # Точные совпадения стоят в начале отсортированного диапазона
+            results.append(rows[position])
+            position += 1
+
+        for index, candidate in enumerate(keys):
+            if len(results) >= limit:
+                break
+            if key in candidate and not candidate.startswith(key):
+                results.append(rows[index])
+        return results
+
+    def _is_stale(self, snapshot, version):
+        return (
+            snapshot is None
+            or snapshot["version"] != version
+            or time.monotonic() > snapshot["expires_at"]
+        )
+
+    def _get_snapshot(self):
+        # Версия читается до построения: изменение во время построения
+        # сменит ее, и индекс перестроится при следующем обращении
+        version = self.version()
+        snapshot = self._snapshot
+        if self._is_stale(snapshot, version):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._is_stale(snapshot, version):
+                    snapshot = self._build(version)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def _build(self, version):
+        from .models import Ingredient
+
+        rows = sorted(
+            Ingredient.objects.values("id", "name", "measurement_unit"),
+            key=lambda row: (normalize(row["name"]), row["measurement_unit"]),
+        )
+        return {
+            "keys": [normalize(row["name"]) for row in rows],
+            "rows": rows,
+            "by_id": {row["id"]: row for row in rows},
+            "digest": hashlib.md5(repr(rows).encode()).hexdigest(),
+            "version": version,
+            "expires_at": time.monotonic() + self.ttl,
+        }
+
+
+ingredient_index = IngredientIndex()
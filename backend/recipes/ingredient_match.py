@@ -0,0 +1,95 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .constants import INGREDIENTS_MATCH_ALL, INGREDIENTS_MATCH_ANY
+from .models import Recipe, RecipeIngredients
+
+# Доля не определена у рецептов с нулевым счетчиком ингредиентов,
+# такие рецепты идут в конце
+INGREDIENTS_MATCH_ORDERING = (
+    F("ingredients_coverage").desc(nulls_last=True),
+    "ingredients_missing",
+    "-pub_date",
+    "-id",
+)
+
+
+def match_ingredients(queryset, ingredient_ids, mode):
+    """
+    Оставляет рецепты, в которых есть все (all) или хотя бы один
+    (any, best) из ингредиентов ingredient_ids.
+    Добавляет аннотации ingredients_matched - сколько ингредиентов
+    рецепта есть в наборе и ingredients_missing - скольких не хватает.
+    В режимах all и best рецепты идут по убыванию доли имеющихся
+    ингредиентов, затем по возрастанию числа недостающих
+    """
+    ingredient_ids = sorted(set(ingredient_ids))
+    if not ingredient_ids:
+        return queryset
+    if connection.vendor == "postgresql":
+        queryset = filter_by_ingredient_ids(queryset, ingredient_ids, mode)
+    else:
+        queryset = filter_by_postings(queryset, ingredient_ids, mode)
+
+    matched = Coalesce(
+        Subquery(
+            RecipeIngredients.objects.filter(
+                recipe=OuterRef("pk"), ingredient__in=ingredient_ids
+            ).order_by().values("recipe").annotate(
+                total=Count("pk")
+            ).values("total")
+        ),
+        0,
+    )
+    queryset = queryset.annotate(
+        ingredients_matched=matched,
+        ingredients_missing=F("ingredients_count") - F("ingredients_matched"),
+    )
+    if mode == INGREDIENTS_MATCH_ANY:
+        return queryset
+    return queryset.annotate(
+        ingredients_coverage=(
+            Cast("ingredients_matched", FloatField())
+            / NullIf(Cast("ingredients_count", FloatField()), 0.0)
+        ),
+    ).order_by(*INGREDIENTS_MATCH_ORDERING)
+
+
+def filter_by_ingredient_ids(queryset, ingredient_ids, mode):
+    """
+    Отбор по столбцу ingredient_ids с индексом GIN:
+    @> для режима all и && для остальных
+    """
+    ids = RawSQL(
+        f"{connection.ops.quote_name(Recipe._meta.db_table)}.ingredient_ids",
+        (),
+        output_field=ArrayField(BigIntegerField()),
+    )
+    lookup = "contains" if mode == INGREDIENTS_MATCH_ALL else "overlap"
+    return queryset.alias(ingredient_ids=ids).filter(
+        **{f"ingredient_ids__{lookup}": ingredient_ids}
+    )
+
+
+def filter_by_postings(queryset, ingredient_ids, mode):
+    """
+    Отбор по таблице ингредиентов рецептов для СУБД без массивов
+    """
+    postings = RecipeIngredients.objects.filter(
+        ingredient__in=ingredient_ids
+    ).order_by().values("recipe")
+    if mode == INGREDIENTS_MATCH_ALL:
+        postings = postings.annotate(total=Count("pk")).filter(
+            total=len(ingredient_ids)
+        ).values("recipe")
+    return queryset.filter(pk__in=postings)
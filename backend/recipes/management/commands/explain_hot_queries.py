@@ -0,0 +1,233 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+
+from recipes.constants import (
+    INGREDIENTS_MATCH_BEST,
+    RECIPES_ORDERING_POPULAR,
+    RECIPES_ORDERING_TRENDING,
+)
+from recipes.counters import recount_counters
+from recipes.feed import fan_out_recipes
+from recipes.ingredient_match import match_ingredients
+from recipes.models import (
+    Favorite,
+    FeedEntry,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from recipes.search import search_recipes
+from recipes.shopping_totals import rebuild_shopping_totals
+from recipes.trending import add_trending_events, order_recipes
+from users.models import Subscription, User
+
+SEED_PAGE_SIZE = 6
+SEED_INGREDIENTS_PER_RECIPE = 8
+SEED_RELATIONS_PER_USER = 50
+SEED_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Выводит EXPLAIN ANALYZE для основных запросов API "
+        "на тестовом наборе данных"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Количество рецептов в тестовом наборе данных",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не откатывать тестовый набор данных",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            user = (
+                User.objects.annotate(favorites=Count("favorite"))
+                .order_by("-favorites")
+                .first()
+            )
+            if user is None:
+                self.stderr.write("В базе нет пользователей")
+                return
+            for title, queryset in self.get_hot_queries(user):
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.stdout.write(self.explain(queryset))
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def explain(self, queryset):
+        """
+        EXPLAIN ANALYZE на PostgreSQL, обычный EXPLAIN на других СУБД
+        """
+        if connection.vendor == "postgresql":
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    def get_hot_queries(self, user):
+        """
+        Запросы той же формы, что выполняют api/views.py и api/filters.py
+        """
+        recipes = Recipe.objects.with_user_relations(user)
+        last = Recipe.objects.order_by("-pub_date", "-id")[
+            SEED_PAGE_SIZE:SEED_PAGE_SIZE + 1
+        ].first()
+        author_id = (
+            Recipe.objects.values_list("author", flat=True).first()
+        )
+        yield "Лента рецептов", recipes[:SEED_PAGE_SIZE]
+        if last is not None:
+            yield "Лента рецептов, курсор", recipes.filter(
+                Q(pub_date__lt=last.pub_date)
+                | Q(pub_date=last.pub_date, id__lt=last.id)
+            ).order_by("-pub_date", "-id")[:SEED_PAGE_SIZE]
+        yield "Рецепты автора", recipes.filter(
+            author=author_id
+        )[:SEED_PAGE_SIZE]
+        yield "Поиск рецептов", search_recipes(
+            recipes, "seed"
+        )[:SEED_PAGE_SIZE]
+        yield "Подбор по ингредиентам", match_ingredients(
+            recipes,
+            Ingredient.objects.values_list("id", flat=True)[:3],
+            INGREDIENTS_MATCH_BEST,
+        )[:SEED_PAGE_SIZE]
+        yield "Популярные рецепты", order_recipes(
+            recipes, RECIPES_ORDERING_POPULAR
+        )[:SEED_PAGE_SIZE]
+        yield "Набирающие популярность", order_recipes(
+            recipes, RECIPES_ORDERING_TRENDING
+        )[:SEED_PAGE_SIZE]
+        yield "Избранное", recipes.filter(
+            favorite__user=user
+        )[:SEED_PAGE_SIZE]
+        yield "Список покупок", recipes.filter(
+            shopping_list__user=user
+        )[:SEED_PAGE_SIZE]
+        yield "Лента подписок", FeedEntry.objects.filter(
+            user=user
+        ).order_by("-pub_date", "-recipe_id")[:SEED_PAGE_SIZE]
+        yield "Подписки", User.objects.filter(
+            author__user=user
+        ).order_by("id")[:SEED_PAGE_SIZE]
+        cart_recipe_ids = list(ShoppingCart.objects.filter(
+            user=user
+        ).values_list("recipe", flat=True)[:SEED_PAGE_SIZE])
+        yield "Ингредиенты рецептов списка покупок", (
+            RecipeIngredients.objects.filter(recipe_id__in=cart_recipe_ids)
+        ).values_list(
+            "ingredient",
+        ).annotate(
+            total_amount=Sum("amount"),
+        ).order_by()
+        yield "Скачивание списка покупок", (
+            ShoppingCartIngredient.objects.filter(user=user)
+        ).values(
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            total_amount=F("amount"),
+        ).order_by(
+            "ingredient__name",
+        )
+
+    def seed(self, recipes_count):
+        """
+        Заполняет базу пользователями, рецептами и связями между ними
+        """
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        if len(ingredient_ids) < SEED_INGREDIENTS_PER_RECIPE:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f"seed-{i}", measurement_unit="г")
+                for i in range(SEED_INGREDIENTS_PER_RECIPE)
+            )
+            ingredient_ids = list(
+                Ingredient.objects.values_list("id", flat=True)
+            )
+
+        users_count = max(recipes_count // 10, 2)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f"seed-{i}",
+                    email=f"seed-{i}@example.com",
+                    first_name="seed",
+                    last_name="seed",
+                )
+                for i in range(users_count)
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    name=f"seed-{i}",
+                    text="seed",
+                    cooking_time=random.randint(1, 120),
+                    image="recipes/seed.png",
+                    author=random.choice(users),
+                )
+                for i in range(recipes_count)
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+        RecipeIngredients.objects.bulk_create(
+            (
+                RecipeIngredients(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient_id in random.sample(
+                    ingredient_ids, SEED_INGREDIENTS_PER_RECIPE
+                )
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+        relations_count = min(SEED_RELATIONS_PER_USER, len(recipes))
+        for model in (Favorite, ShoppingCart):
+            relations = model.objects.bulk_create(
+                (
+                    model(user=user, recipe=recipe)
+                    for user in users
+                    for recipe in random.sample(recipes, relations_count)
+                ),
+                batch_size=SEED_BATCH_SIZE,
+            )
+            add_trending_events(model, (
+                (relation.recipe_id, relation.created_at)
+                for relation in relations
+            ))
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user=user, author=author)
+                for user in users
+                for author in random.sample(
+                    users, min(SEED_RELATIONS_PER_USER, users_count)
+                )
+                if author != user
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+        recount_counters()
+        rebuild_shopping_totals()
+        fan_out_recipes(recipes)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
@@ -1,44 +1,87 @@
-import csv
+import os
+import time
+from itertools import islice
 
 from django.core.management.base import BaseCommand
 
-from recipes.models import Ingredient
+from recipes.constants import INGREDIENTS_LOAD_BATCH_SIZE
+from recipes.data_files import get_checksum, iter_csv_rows, iter_json_objects
+from recipes.ingredient_index import ingredient_index
+from recipes.models import DataImport, Ingredient
 
 
 class Command(BaseCommand):
+    help = (
+        "Загружает ингредиенты из data/ingredients.csv или .json "
+        "пачками, пропуская уже загруженный без изменений файл"
+    )
+
     def add_arguments(self, parser):
-        parser.add_argument("--path", type=str)
+        parser.add_argument("--path", type=str, default="data/")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "json"),
+            default="csv",
+            help="Формат файла ingredients.<format>",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=INGREDIENTS_LOAD_BATCH_SIZE,
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Загрузить файл, даже если он не изменился",
+        )
 
     def handle(self, *args, **options):
-        file_path = options["path"] + "ingredients.csv"
-
-        existing_ingredients = set(
-            Ingredient.objects.values_list(
-                'name',
-                'measurement_unit',
+        file_path = os.path.join(
+            options["path"], f"ingredients.{options['format']}"
+        )
+        source = os.path.basename(file_path)
+        checksum = get_checksum(file_path)
+        if not options["force"] and DataImport.objects.filter(
+            source=source, checksum=checksum
+        ).exists():
+            self.stdout.write(
+                f"Файл {file_path} не изменился с последней загрузки"
             )
+            return
+
+        started = time.monotonic()
+        count_before = Ingredient.objects.count()
+        rows = 0
+        with open(file_path, encoding="utf-8") as file:
+            ingredients = self.read_ingredients(file, options["format"])
+            while batch := list(islice(ingredients, options["batch_size"])):
+                # Пара (name, measurement_unit) уникальна, других полей
+                # у ингредиента нет, поэтому повторы просто пропускаются
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                rows += len(batch)
+        created = Ingredient.objects.count() - count_before
+        DataImport.objects.update_or_create(
+            source=source,
+            defaults={"checksum": checksum, "rows": rows},
         )
+        if created:
+            ingredient_index.invalidate()
 
-        ingredients_to_create = []
-        with open(file_path, "r") as csv_file:
-            reader = csv.reader(csv_file)
-
-            for row in reader:
-                name = row[0].strip()
-                unit = row[1].strip()
-
-                if (name, unit) not in existing_ingredients:
-                    ingredients_to_create.append(
-                        Ingredient(name=name, measurement_unit=unit)
-                    )
-                else:
-                    print(f"Ингредиент '{name} ({unit})'"
-                          f"уже есть в базе данных")
-
-        if ingredients_to_create:
-            created_count = len(
-                Ingredient.objects.bulk_create(
-                    ingredients_to_create,
-                )
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"Прочитано строк: {rows}, добавлено ингредиентов: {created} "
+            f"за {elapsed:.2f} с ({rows / elapsed:.0f} строк/с)"
+        )
+
+    def read_ingredients(self, file, file_format):
+        if file_format == "json":
+            rows = (
+                (item["name"], item["measurement_unit"])
+                for item in iter_json_objects(file)
+            )
+        else:
+            rows = (row[:2] for row in iter_csv_rows(file))
+        for name, unit in rows:
+            yield Ingredient(
+                name=name.strip(), measurement_unit=unit.strip()
             )
-            print(f"Добавлено {created_count} новых ингредиентов")
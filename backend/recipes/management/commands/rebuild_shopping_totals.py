@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.shopping_totals import (
+    find_shopping_totals_mismatches,
+    rebuild_shopping_totals,
+)
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает или проверяет суммы ингредиентов в списках покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Ограничить пересчет пользователями с этими id",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить суммы, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options["user_ids"]
+        if not options["check"]:
+            with transaction.atomic():
+                rebuild_shopping_totals(user_ids)
+            self.stdout.write("Суммы списков покупок пересчитаны")
+            return
+
+        mismatches = 0
+        for user_id, ingredient_id, expected, stored in (
+            find_shopping_totals_mismatches(user_ids)
+        ):
+            mismatches += 1
+            self.stdout.write(
+                f"Пользователь {user_id}, ингредиент {ingredient_id}: "
+                f"ожидается {expected}, сохранено {stored}"
+            )
+        if mismatches:
+            raise CommandError(f"Найдено расхождений: {mismatches}")
+        self.stdout.write("Расхождений не найдено")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shopping_cart_ingredient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, help_text='Изображение', upload_to='recipes/', verbose_name='Изображение'),
+        ),
+    ]
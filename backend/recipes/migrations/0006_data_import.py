@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Источник')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма')),
+                ('rows', models.PositiveIntegerField(verbose_name='Строк в файле')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'загрузка данных',
+                'verbose_name_plural': 'загрузки данных',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('pg_catalog.russian', coalesce({0}name, '')), 'A')
+    || setweight(to_tsvector('pg_catalog.russian', coalesce({0}text, '')), 'B')
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector"
+    )
+    schema_editor.execute(f"""
+        CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR.format("NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER recipes_recipe_search_vector
+        BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+        FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector()
+    """)
+    schema_editor.execute(
+        f"UPDATE recipes_recipe SET search_vector = {SEARCH_VECTOR.format('')}"
+    )
+    schema_editor.execute(
+        "CREATE INDEX recipes_recipe_search_vector_idx "
+        "ON recipes_recipe USING gin (search_vector)"
+    )
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "DROP TRIGGER recipes_recipe_search_vector ON recipes_recipe"
+    )
+    schema_editor.execute("DROP FUNCTION recipes_recipe_search_vector()")
+    schema_editor.execute(
+        "ALTER TABLE recipes_recipe DROP COLUMN search_vector"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_data_import'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
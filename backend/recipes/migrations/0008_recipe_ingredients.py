@@ -0,0 +1,127 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+INGREDIENT_IDS = """
+    ARRAY(
+        SELECT ingredient_id FROM recipes_recipeingredients
+        WHERE recipe_id = recipes_recipe.id
+        ORDER BY ingredient_id
+    )
+"""
+
+
+def fill_ingredients_count(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeIngredients = apps.get_model("recipes", "RecipeIngredients")
+    Recipe.objects.update(
+        ingredients_count=Coalesce(
+            Subquery(
+                RecipeIngredients.objects.filter(
+                    recipe=OuterRef("pk")
+                ).order_by().values("recipe").annotate(
+                    total=Count("pk")
+                ).values("total")
+            ),
+            0,
+        ),
+    )
+
+
+def create_ingredient_ids(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE recipes_recipe "
+        "ADD COLUMN ingredient_ids bigint[] NOT NULL DEFAULT '{}'"
+    )
+    # Пересчитывает массив только у рецептов, в которых изменился
+    # набор ингредиентов: изменение количества его не трогает
+    schema_editor.execute(f"""
+        CREATE FUNCTION recipes_recipe_ingredient_ids() RETURNS trigger AS $$
+        DECLARE
+            changed bigint[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                changed := ARRAY(SELECT recipe_id FROM new_rows);
+            ELSIF TG_OP = 'DELETE' THEN
+                changed := ARRAY(SELECT recipe_id FROM old_rows);
+            ELSE
+                changed := ARRAY(
+                    SELECT recipe_id FROM (
+                        (
+                            SELECT recipe_id, ingredient_id FROM old_rows
+                            EXCEPT
+                            SELECT recipe_id, ingredient_id FROM new_rows
+                        )
+                        UNION
+                        (
+                            SELECT recipe_id, ingredient_id FROM new_rows
+                            EXCEPT
+                            SELECT recipe_id, ingredient_id FROM old_rows
+                        )
+                    ) AS difference
+                );
+            END IF;
+            UPDATE recipes_recipe SET ingredient_ids = {INGREDIENT_IDS}
+            WHERE id = ANY(changed);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER recipes_recipe_ingredient_ids_insert
+        AFTER INSERT ON recipes_recipeingredients
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_ingredient_ids()
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER recipes_recipe_ingredient_ids_update
+        AFTER UPDATE ON recipes_recipeingredients
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_ingredient_ids()
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER recipes_recipe_ingredient_ids_delete
+        AFTER DELETE ON recipes_recipeingredients
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_ingredient_ids()
+    """)
+    schema_editor.execute(
+        f"UPDATE recipes_recipe SET ingredient_ids = {INGREDIENT_IDS}"
+    )
+    schema_editor.execute(
+        "CREATE INDEX recipes_recipe_ingredient_ids_idx "
+        "ON recipes_recipe USING gin (ingredient_ids)"
+    )
+
+
+def drop_ingredient_ids(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for operation in ("insert", "update", "delete"):
+        schema_editor.execute(
+            f"DROP TRIGGER recipes_recipe_ingredient_ids_{operation} "
+            "ON recipes_recipeingredients"
+        )
+    schema_editor.execute("DROP FUNCTION recipes_recipe_ingredient_ids()")
+    schema_editor.execute(
+        "ALTER TABLE recipes_recipe DROP COLUMN ingredient_ids"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ингредиентов'),
+        ),
+        migrations.RunPython(fill_ingredients_count, migrations.RunPython.noop),
+        migrations.RunPython(create_ingredient_ids, drop_ingredient_ids),
+    ]
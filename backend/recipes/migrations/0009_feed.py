@@ -0,0 +1,73 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FANOUT_MAX_SUBSCRIBERS = 1000
+BACKFILL_SIZE = 50
+BATCH_SIZE = 1000
+
+
+def fill_feed(apps, schema_editor):
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    Recipe = apps.get_model("recipes", "Recipe")
+    Subscription = apps.get_model("users", "Subscription")
+    User = apps.get_model("users", "User")
+    User.objects.filter(
+        subscribers_count__gte=FANOUT_MAX_SUBSCRIBERS
+    ).update(feed_pull=True)
+    authors = User.objects.filter(
+        subscribers_count__gt=0, feed_pull=False
+    ).values_list("pk", flat=True)
+    for author_id in authors.iterator():
+        recipes = list(Recipe.objects.filter(
+            author=author_id
+        ).order_by("-pub_date", "-id").values_list(
+            "pk", "pub_date"
+        )[:BACKFILL_SIZE])
+        followers = Subscription.objects.filter(
+            author=author_id
+        ).values_list("user", flat=True)
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for user_id in followers
+                for recipe_id, pub_date in recipes
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_ingredients'),
+        ('users', '0005_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'записи ленты',
+                'indexes': [models.Index(fields=['user', '-pub_date', '-recipe'], include=('author',), name='feed_entry_user_pub_date_idx'), models.Index(fields=['user', 'author'], name='feed_entry_user_author_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry')],
+            },
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:53
+
+import math
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.db.models.functions import Ln
+from django.utils import timezone
+
+from recipes.constants import (
+    TRENDING_EPOCH,
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE,
+    TRENDING_SHOPPING_CART_WEIGHT,
+)
+
+
+def get_decay(model):
+    created_at = model.objects.values_list("created_at", flat=True).first()
+    return math.log(2) / TRENDING_HALF_LIFE * (
+        (created_at or timezone.now()).timestamp() - TRENDING_EPOCH
+    )
+
+
+def fill_trending_score(apps, schema_editor):
+    # Настоящие даты добавления неизвестны: существующие связи получили
+    # дату миграции и учитываются так, будто созданы в этот момент
+    Recipe = apps.get_model("recipes", "Recipe")
+    favorite_decay = get_decay(apps.get_model("recipes", "Favorite"))
+    shopping_decay = get_decay(apps.get_model("recipes", "ShoppingCart"))
+    Recipe.objects.filter(
+        Q(favorites_count__gt=0) | Q(shopping_count__gt=0)
+    ).update(
+        trending_score=Ln(
+            F("favorites_count") * TRENDING_FAVORITE_WEIGHT
+            + F("shopping_count") * TRENDING_SHOPPING_CART_WEIGHT
+            * math.exp(shopping_decay - favorite_decay)
+        ) + favorite_decay,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similar_recipes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(editable=False, null=True, verbose_name='Оценка популярности'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            fill_trending_score, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('trending_score__isnull', False)), fields=['-trending_score', '-pub_date', '-id'], name='recipe_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+def fill_image_variants_ready(apps, schema_editor):
+    # Копии, созданные до миграции, проверяются в хранилище один раз
+    from api.constants import IMAGE_VARIANTS
+    from api.images import get_variant_name, variant_storage
+
+    Recipe = apps.get_model("recipes", "Recipe")
+    names = Recipe.objects.exclude(image__isnull=True).exclude(
+        image=""
+    ).order_by().values_list("image", flat=True).distinct()
+    ready = [
+        name for name in names
+        if all(
+            variant_storage.exists(get_variant_name(name, variant))
+            for variant in IMAGE_VARIANTS
+        )
+    ]
+    for start in range(0, len(ready), 500):
+        Recipe.objects.filter(
+            image__in=ready[start:start + 500]
+        ).update(image_variants_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Уменьшенные копии изображения созданы'),
+        ),
+        migrations.RunPython(
+            fill_image_variants_ready, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_image_variants_ready'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='recipeingredients',
+            name='unique_recipe_ingredient',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipeingredients',
+            name='recipe_ingredient_amount_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), include=('amount',), name='unique_recipe_ingredient'),
+        ),
+    ]
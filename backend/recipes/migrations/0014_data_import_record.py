@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_ingredient_covering_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataImportRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма записи')),
+                ('data_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='recipes.dataimport', verbose_name='Загрузка')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_records', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'загруженная запись',
+                'verbose_name_plural': 'загруженные записи',
+                'constraints': [models.UniqueConstraint(fields=('data_import', 'checksum'), name='unique_data_import_record')],
+            },
+        ),
+    ]
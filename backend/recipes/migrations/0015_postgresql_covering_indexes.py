@@ -0,0 +1,58 @@
+from django.db import migrations, models
+
+CREATE_RECIPE_INGREDIENT_AMOUNT_INDEX = (
+    "CREATE INDEX recipe_ingredient_amount_idx "
+    "ON recipes_recipeingredients (recipe_id, ingredient_id) "
+    "INCLUDE (amount)"
+)
+DROP_RECIPE_INGREDIENT_AMOUNT_INDEX = (
+    "DROP INDEX IF EXISTS recipe_ingredient_amount_idx"
+)
+
+
+def run_on_postgresql(sql):
+    """
+    Выполняет SQL только на PostgreSQL: покрывающие индексы
+    другие СУБД не поддерживают
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_data_import_record'),
+    ]
+
+    operations = [
+        # Ограничение с INCLUDE на SQLite не создавалось вовсе
+        migrations.RemoveConstraint(
+            model_name='recipeingredients',
+            name='unique_recipe_ingredient',
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_RECIPE_INGREDIENT_AMOUNT_INDEX),
+            run_on_postgresql(DROP_RECIPE_INGREDIENT_AMOUNT_INDEX),
+        ),
+        # Индекс в базе не меняется: на PostgreSQL он остается
+        # покрывающим, другие СУБД колонку author и так не включали
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='feedentry',
+                    name='feed_entry_user_pub_date_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='feedentry',
+                    index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_entry_user_pub_date_idx'),
+                ),
+            ],
+        ),
+    ]
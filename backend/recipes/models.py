@@ -1,12 +1,14 @@
 from django.core.validators import MinValueValidator
 from django.db import models
 
-from users.models import User
+from users.models import Subscription, User
 from .constants import (
     AMOUNT_MIN_VALUE,
     AMOUNT_MIN_VALUE_ERROR_MESSAGE,
     COOKING_TIME_MIN_VALUE,
     COOKING_TIME_MIN_VALUE_ERROR_MESSAGE,
+    DATA_IMPORT_CHECKSUM_MAX_LENGTH,
+    DATA_IMPORT_SOURCE_MAX_LENGTH,
     MAX_FIELD_LENGTH,
     MEASUREMENT_UNIT_DEFAULT,
     RECIPE_IMAGE_UPLOAD_TO,
@@ -45,6 +47,49 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """
+    QuerySet для Recipe
+    """
+    def with_user_relations(self, user):
+        """
+        Подгружает автора и ингредиенты рецептов и аннотирует
+        статусы избранного, списка покупок и подписки на автора
+        для пользователя, чтобы сериализация не делала запросов на рецепт
+        """
+        ingredient_items = models.Prefetch(
+            "ingredient_items",
+            queryset=RecipeIngredients.objects.select_related("ingredient"),
+        )
+        if not user.is_authenticated:
+            return self.select_related("author").prefetch_related(
+                ingredient_items
+            )
+
+        authors = User.objects.annotate(
+            is_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, author=models.OuterRef("pk")
+                )
+            )
+        )
+        return self.prefetch_related(
+            models.Prefetch("author", queryset=authors),
+            ingredient_items,
+        ).annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+        )
+
+
 class Recipe(models.Model):
     """
     Модель для рецепта
@@ -79,26 +124,118 @@ class Recipe(models.Model):
         verbose_name="Изображение",
         help_text="Изображение",
         upload_to=RECIPE_IMAGE_UPLOAD_TO,
+        db_index=True,
     )
     pub_date = models.DateTimeField(
         verbose_name="Дата публикования",
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name="recipes",
         verbose_name="Автор",
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В избранном",
+    )
+    shopping_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В списках покупок",
+    )
+    ingredients_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Ингредиентов",
+    )
+    similar_computed_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name="Дата расчета похожих рецептов",
+    )
+    trending_score = models.FloatField(
+        null=True,
+        editable=False,
+        verbose_name="Оценка популярности",
+    )
+    image_variants_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Уменьшенные копии изображения созданы",
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    # Поля, которые save() существующего рецепта не перезаписывает:
+    # их меняют отдельными UPDATE фоновые задачи и обработчики сигналов,
+    # и значение в памяти может быть устаревшим
+    managed_fields = (
+        # Счетчики связей, меняются в recipes.counters
+        "favorites_count",
+        "shopping_count",
+        "ingredients_count",
+        # Время расчета похожих рецептов, пишет build_similar_recipes
+        # и сбрасывает удаление рецепта из списков похожих
+        "similar_computed_at",
+        # Оценка популярности, меняется с избранным и decay_trending
+        "trending_score",
+        # Отметка о копиях изображения, ставит фоновый пул
+        "image_variants_ready",
+    )
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "рецепт"
         verbose_name_plural = "рецепты"
 
+        indexes = (
+            # Лента рецептов и курсорная пагинация по (pub_date, id)
+            models.Index(
+                fields=("-pub_date", "-id"),
+                name="recipe_pub_date_id_idx",
+            ),
+            # Рецепты автора: фильтр author, сортировка по дате
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                name="recipe_author_pub_date_idx",
+            ),
+            # Сортировка ordering=popular
+            models.Index(
+                fields=("-favorites_count", "-pub_date", "-id"),
+                name="recipe_popular_idx",
+            ),
+            # Сортировка ordering=trending и сброс затухших оценок
+            models.Index(
+                fields=("-trending_score", "-pub_date", "-id"),
+                name="recipe_trending_idx",
+                condition=models.Q(trending_score__isnull=False),
+            ),
+        )
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Поля из managed_fields меняются отдельными UPDATE,
+        поэтому при сохранении существующего рецепта
+        их значения из памяти не записываются
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.managed_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredients(models.Model):
     """
@@ -130,6 +267,11 @@ class RecipeIngredients(models.Model):
         verbose_name = "ингредиенты"
         verbose_name_plural = "ингредиенты"
 
+        # На PostgreSQL миграция 0015 добавляет индекс
+        # recipe_ingredient_amount_idx (recipe, ingredient) INCLUDE (amount):
+        # суммирование ингредиентов рецептов читает только его.
+        # В модели он не объявлен, потому что на СУБД без покрывающих
+        # индексов Django пропустил бы ограничение или колонку
         constraints = (
             models.UniqueConstraint(
                 fields=("recipe", "ingredient"),
@@ -157,6 +299,10 @@ class Favorite(models.Model):
         related_name="favorite",
         verbose_name="Рецепт",
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата добавления",
+    )
 
     class Meta:
         verbose_name = "избранное"
@@ -188,6 +334,10 @@ class ShoppingCart(models.Model):
         related_name="shopping_list",
         verbose_name="Рецепт",
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата добавления",
+    )
 
     class Meta:
         verbose_name = "список покупок"
@@ -203,3 +353,210 @@ class ShoppingCart(models.Model):
         return (
             f"Рецепт {self.recipe} в списке покупок у {self.user}"
         )
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Модель для суммарного количества ингредиента
+    в списке покупок пользователя.
+    Поддерживается при изменении списка покупок и рецептов в нем
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_cart_totals",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_cart_totals",
+        verbose_name="Ингредиент",
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name="Количество",
+    )
+
+    class Meta:
+        verbose_name = "ингредиент списка покупок"
+        verbose_name_plural = "ингредиенты списков покупок"
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_shopping_cart_ingredient",
+            ),
+        )
+
+    def __str__(self):
+        return (
+            f"{self.ingredient} ({self.amount}) в списке покупок у {self.user}"
+        )
+
+
+class SimilarRecipe(models.Model):
+    """
+    Модель для рецепта, похожего на данный по набору ингредиентов.
+    Заполняется командой build_similar_recipes
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_items",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_to",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField(
+        verbose_name="Сходство",
+    )
+
+    class Meta:
+        verbose_name = "похожий рецепт"
+        verbose_name_plural = "похожие рецепты"
+
+        indexes = (
+            # Похожие рецепты читаются одним диапазоном индекса
+            models.Index(
+                fields=("recipe", "-score"),
+                name="similar_recipe_score_idx",
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "similar"),
+                name="unique_similar_recipe",
+            ),
+        )
+
+    def __str__(self):
+        return f"Рецепт {self.similar} похож на {self.recipe}"
+
+
+class FeedEntry(models.Model):
+    """
+    Модель для записи в ленте подписчика.
+    Создается при публикации рецепта для каждого подписчика автора
+    и при подписке для последних рецептов автора
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации",
+    )
+
+    class Meta:
+        verbose_name = "запись ленты"
+        verbose_name_plural = "записи ленты"
+
+        indexes = (
+            # Страница ленты читается одним диапазоном индекса.
+            # На PostgreSQL индекс включает author (миграции 0009, 0015),
+            # на других СУБД это обычный индекс
+            models.Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="feed_entry_user_pub_date_idx",
+            ),
+            # Удаление записей автора при отписке
+            models.Index(
+                fields=("user", "author"),
+                name="feed_entry_user_author_idx",
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_feed_entry",
+            ),
+        )
+
+    def __str__(self):
+        return f"Рецепт {self.recipe} в ленте у {self.user}"
+
+
+class DataImport(models.Model):
+    """
+    Модель для последней загрузки файла с данными.
+    По контрольной сумме повторная загрузка того же файла пропускается
+    """
+    source = models.CharField(
+        max_length=DATA_IMPORT_SOURCE_MAX_LENGTH,
+        unique=True,
+        verbose_name="Источник",
+    )
+    checksum = models.CharField(
+        max_length=DATA_IMPORT_CHECKSUM_MAX_LENGTH,
+        verbose_name="Контрольная сумма",
+    )
+    rows = models.PositiveIntegerField(
+        verbose_name="Строк в файле",
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата загрузки",
+    )
+
+    class Meta:
+        verbose_name = "загрузка данных"
+        verbose_name_plural = "загрузки данных"
+
+    def __str__(self):
+        return f"{self.source} ({self.imported_at:%Y-%m-%d %H:%M})"
+
+
+class DataImportRecord(models.Model):
+    """
+    Модель для записи файла, уже загруженной в базу.
+    Запись определяется контрольной суммой содержимого, поэтому
+    повторная загрузка файла пропускает только те же самые записи
+    """
+    data_import = models.ForeignKey(
+        DataImport,
+        on_delete=models.CASCADE,
+        related_name="records",
+        verbose_name="Загрузка",
+    )
+    checksum = models.CharField(
+        max_length=DATA_IMPORT_CHECKSUM_MAX_LENGTH,
+        verbose_name="Контрольная сумма записи",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="import_records",
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        verbose_name = "загруженная запись"
+        verbose_name_plural = "загруженные записи"
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=("data_import", "checksum"),
+                name="unique_data_import_record",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.data_import}: {self.checksum}"
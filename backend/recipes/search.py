@@ -0,0 +1,173 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+)
+from django.db import connection, connections
+from django.db.models import F, FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+
+from .constants import (
+    SEARCH_CONFIG,
+    SEARCH_FTS_TABLE,
+    SEARCH_NAME_WEIGHT,
+    SEARCH_SNIPPET_ELLIPSIS,
+    SEARCH_SNIPPET_START,
+    SEARCH_SNIPPET_STOP,
+    SEARCH_SNIPPET_WORDS,
+    SEARCH_TEXT_WEIGHT,
+)
+from .models import Recipe
+
+SEARCH_ORDERING = ("-search_rank", "-pub_date", "-id")
+
+SQLITE_SEARCH_INDEX = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_FTS_TABLE}_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+)
+
+
+def install_search_index(using):
+    """
+    Создает индекс FTS5 и триггеры, которые его поддерживают, на SQLite.
+    Вызывается после каждой миграции: при пересоздании таблицы рецептов
+    SQLite удаляет ее триггеры, и тогда индекс строится заново.
+    На PostgreSQL индекс создает миграция
+    """
+    database = connections[using]
+    if database.vendor != "sqlite":
+        return
+    with database.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = 'recipes_recipe' "
+            "AND name LIKE %s",
+            [f"{SEARCH_FTS_TABLE}_%"],
+        )
+        if cursor.fetchone()[0] == len(SQLITE_SEARCH_INDEX) - 1:
+            return
+        for statement in SQLITE_SEARCH_INDEX:
+            cursor.execute(statement)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) "
+            "VALUES ('rebuild')"
+        )
+
+
+def search_recipes(queryset, value):
+    """
+    Оставляет рецепты, подходящие под поисковый запрос,
+    в порядке релевантности. Добавляет аннотации search_rank
+    и search_snippet - фрагмент описания с выделенными словами запроса
+    """
+    value = value.strip()
+    if not value:
+        return queryset
+    if connection.vendor == "postgresql":
+        return search_postgresql(queryset, value)
+    if connection.vendor == "sqlite":
+        return search_sqlite(queryset, value)
+    return queryset.filter(
+        Q(name__icontains=value) | Q(text__icontains=value)
+    )
+
+
+def search_postgresql(queryset, value):
+    """
+    Поиск по столбцу search_vector с индексом GIN.
+    Синтаксис запроса как у поисковых систем: "фраза", -исключение, or
+    """
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+    vector = RawSQL(
+        f"{connection.ops.quote_name(Recipe._meta.db_table)}.search_vector",
+        (),
+        output_field=SearchVectorField(),
+    )
+    return queryset.alias(search_vector=vector).filter(
+        search_vector=query,
+    ).annotate(
+        search_rank=SearchRank(F("search_vector"), query),
+        search_snippet=SearchHeadline(
+            "text",
+            query,
+            config=SEARCH_CONFIG,
+            start_sel=SEARCH_SNIPPET_START,
+            stop_sel=SEARCH_SNIPPET_STOP,
+            fragment_delimiter=SEARCH_SNIPPET_ELLIPSIS,
+            max_words=SEARCH_SNIPPET_WORDS,
+            min_words=SEARCH_SNIPPET_WORDS // 2,
+            max_fragments=1,
+        ),
+    ).order_by(*SEARCH_ORDERING)
+
+
+def search_sqlite(queryset, value):
+    """
+    Поиск по таблице FTS5. Стеммера для русского языка в SQLite нет,
+    поэтому каждое слово запроса ищется как префикс
+    """
+    terms = re.findall(r"\w+", value)
+    if not terms:
+        return queryset.none()
+    match = " ".join(f'"{term}"*' for term in terms)
+    table = connection.ops.quote_name(Recipe._meta.db_table)
+    matched = (
+        f"FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH %s "
+        f"AND {SEARCH_FTS_TABLE}.rowid = {table}.id"
+    )
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_FTS_TABLE} "
+            f"WHERE {SEARCH_FTS_TABLE} MATCH %s",
+            (match,),
+        ),
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT -bm25({SEARCH_FTS_TABLE}, %s, %s) {matched}",
+            (SEARCH_NAME_WEIGHT, SEARCH_TEXT_WEIGHT, match),
+            output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            f"SELECT snippet({SEARCH_FTS_TABLE}, 1, %s, %s, %s, %s) "
+            f"{matched}",
+            (
+                SEARCH_SNIPPET_START,
+                SEARCH_SNIPPET_STOP,
+                SEARCH_SNIPPET_ELLIPSIS,
+                SEARCH_SNIPPET_WORDS,
+                match,
+            ),
+            output_field=TextField(),
+        ),
+    ).order_by(*SEARCH_ORDERING)
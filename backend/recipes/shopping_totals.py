@@ -0,0 +1,202 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .constants import SHOPPING_TOTALS_BATCH_SIZE
+from .models import RecipeIngredients, ShoppingCart, ShoppingCartIngredient
+
+# Поля удаляемых строк, по которым из списков покупок
+# вычитается их вклад
+DELETED_ROW_FIELDS = {
+    ShoppingCart: ("user_id", "recipe_id"),
+    RecipeIngredients: ("recipe_id", "ingredient_id", "amount"),
+}
+
+
+def get_recipe_amounts(recipe_ids):
+    """
+    Суммарное количество каждого ингредиента в рецептах
+    """
+    return dict(
+        RecipeIngredients.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).values_list(
+            "ingredient",
+        ).annotate(
+            total_amount=Sum("amount"),
+        ).order_by()
+    )
+
+
+def update_shopping_totals(user_ids, deltas):
+    """
+    Изменяет суммы ингредиентов в списках покупок пользователей
+    на deltas ({id ингредиента: изменение количества}).
+    user_ids — список id или queryset с id пользователей
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not deltas:
+        return
+
+    added = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta > 0
+    ]
+    if added:
+        ShoppingCartIngredient.objects.bulk_create(
+            (
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id in added
+            ),
+            batch_size=SHOPPING_TOTALS_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    totals = ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas.keys()
+    )
+    totals.update(amount=Greatest(
+        F("amount") + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=Value(0),
+        ),
+        Value(0),
+    ))
+    totals.filter(amount=0).delete()
+
+
+def add_to_shopping_totals(user_id, recipe_ids):
+    """
+    Учитывает добавление рецептов в список покупок пользователя
+    """
+    update_shopping_totals([user_id], get_recipe_amounts(recipe_ids))
+
+
+def remove_from_shopping_totals(user_id, recipe_ids):
+    """
+    Учитывает удаление рецептов из списка покупок пользователя
+    """
+    update_shopping_totals([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe_in_shopping_totals(recipe_id, deltas):
+    """
+    Учитывает изменение ингредиентов рецепта
+    во всех списках покупок, где он есть
+    """
+    update_shopping_totals(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list("user", flat=True),
+        deltas,
+    )
+
+
+def change_ingredient_in_shopping_totals(recipe_id, old, new):
+    """
+    Учитывает изменение одной строки ингредиента рецепта.
+    old и new — пары (id ингредиента, количество) или None
+    """
+    deltas = Counter()
+    if old is not None:
+        deltas[old[0]] -= old[1]
+    if new is not None:
+        deltas[new[0]] += new[1]
+    change_recipe_in_shopping_totals(recipe_id, deltas)
+
+
+def remove_deleted_from_shopping_totals(model, rows):
+    """
+    Вычитает из списков покупок вклад удаленных строк model.
+    rows — словари со значениями полей DELETED_ROW_FIELDS[model]
+    """
+    if model is ShoppingCart:
+        recipes_by_user = defaultdict(list)
+        for row in rows:
+            recipes_by_user[row["user_id"]].append(row["recipe_id"])
+        for user_id, recipe_ids in recipes_by_user.items():
+            remove_from_shopping_totals(user_id, recipe_ids)
+    elif model is RecipeIngredients:
+        deltas_by_recipe = defaultdict(Counter)
+        for row in rows:
+            deltas_by_recipe[row["recipe_id"]][
+                row["ingredient_id"]
+            ] -= row["amount"]
+        for recipe_id, deltas in deltas_by_recipe.items():
+            change_recipe_in_shopping_totals(recipe_id, deltas)
+
+
+def get_expected_shopping_totals(user_ids=None):
+    """
+    Суммы ингредиентов, посчитанные заново по спискам покупок:
+    итератор по (id пользователя, id ингредиента, количество)
+    """
+    items = RecipeIngredients.objects.filter(
+        recipe__shopping_list__isnull=False,
+    )
+    if user_ids is not None:
+        items = RecipeIngredients.objects.filter(
+            recipe__shopping_list__user_id__in=user_ids,
+        )
+    return items.values_list(
+        "recipe__shopping_list__user", "ingredient",
+    ).annotate(
+        total_amount=Sum("amount"),
+    ).order_by().iterator(chunk_size=SHOPPING_TOTALS_BATCH_SIZE)
+
+
+def rebuild_shopping_totals(user_ids=None):
+    """
+    Пересчитывает суммы ингредиентов в списках покупок с нуля
+    """
+    totals = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+    totals.delete()
+    ShoppingCartIngredient.objects.bulk_create(
+        (
+            ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for user_id, ingredient_id, amount
+            in get_expected_shopping_totals(user_ids)
+        ),
+        batch_size=SHOPPING_TOTALS_BATCH_SIZE,
+    )
+
+
+def find_shopping_totals_mismatches(user_ids=None):
+    """
+    Сравнивает сохраненные суммы с пересчитанными:
+    итератор по (id пользователя, id ингредиента, ожидается, сохранено)
+    """
+    totals = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+    actual = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in totals.values_list(
+            "user", "ingredient", "amount"
+        ).iterator(chunk_size=SHOPPING_TOTALS_BATCH_SIZE)
+    }
+    for user_id, ingredient_id, amount in get_expected_shopping_totals(
+        user_ids
+    ):
+        stored = actual.pop((user_id, ingredient_id), None)
+        if stored != amount:
+            yield user_id, ingredient_id, amount, stored
+    for (user_id, ingredient_id), stored in actual.items():
+        yield user_id, ingredient_id, None, stored
@@ -0,0 +1,205 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from users.models import Subscription
+from .counters import COUNTERS, change_counters, increment_counters
+from .feed import add_to_feed, fan_out_recipes, remove_from_feed
+from .ingredient_index import ingredient_index
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingCart,
+)
+from .search import install_search_index
+from .shopping_totals import (
+    add_to_shopping_totals,
+    change_ingredient_in_shopping_totals,
+    change_recipe_in_shopping_totals,
+    get_recipe_amounts,
+    remove_from_shopping_totals,
+)
+from .trending import (
+    TRENDING_WEIGHTS,
+    add_trending_events,
+    remove_trending_events,
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """
+    Сбрасывает индекс ингредиентов во всех процессах
+    после фиксации изменения каталога
+    """
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using, **kwargs):
+    """
+    Восстанавливает поисковый индекс рецептов после миграций
+    """
+    if sender.name == "recipes":
+        install_search_index(using)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_totals(instance, **kwargs):
+    """
+    Вычитает ингредиенты удаляемого рецепта из списков покупок
+    до того, как каскадно удалятся его ингредиенты
+    """
+    change_recipe_in_shopping_totals(instance.pk, {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipe_amounts([instance.pk]).items()
+    })
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_similar_lists_stale(instance, **kwargs):
+    """
+    Отмечает для пересчета рецепты, в списках похожих которых
+    есть удаляемый рецепт: строки списков удалятся каскадно,
+    и без отметки пересчет без --full их не дополнит
+    """
+    Recipe.objects.filter(
+        similar_items__similar=instance
+    ).exclude(pk=instance.pk).update(similar_computed_at=None)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_row_saved(instance, created, **kwargs):
+    """
+    Добавляет ингредиенты рецепта в суммы списка покупок
+    """
+    if created:
+        add_to_shopping_totals(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_row_deleted(instance, origin=None, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из сумм списка покупок.
+    Удаления через queryset учитывает delete_counted,
+    при удалении рецепта суммы меняет remove_recipe_from_shopping_totals,
+    при удалении пользователя его суммы удаляются каскадно
+    """
+    if isinstance(origin, ShoppingCart):
+        remove_from_shopping_totals(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_init, sender=RecipeIngredients)
+def remember_ingredient_amount(instance, **kwargs):
+    """
+    Запоминает ингредиент и количество, загруженные из базы
+    """
+    instance._stored_amount = (
+        instance.__dict__.get("ingredient_id"),
+        instance.__dict__.get("amount"),
+    )
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def recipe_ingredient_saved(instance, created, **kwargs):
+    """
+    Учитывает в списках покупок добавленный или измененный
+    ингредиент рецепта, например из админки
+    """
+    new = (instance.ingredient_id, instance.amount)
+    old = None if created else instance._stored_amount
+    if old != new:
+        change_ingredient_in_shopping_totals(instance.recipe_id, old, new)
+    instance._stored_amount = new
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def recipe_ingredient_deleted(instance, origin=None, **kwargs):
+    """
+    Вычитает удаленный ингредиент рецепта из списков покупок.
+    Удаления через queryset учитывает delete_counted,
+    при удалении рецепта — remove_recipe_from_shopping_totals
+    """
+    if isinstance(origin, RecipeIngredients):
+        change_ingredient_in_shopping_totals(
+            instance.recipe_id, instance._stored_amount, None
+        )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredients)
+@receiver(post_save, sender=Subscription)
+def counted_row_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик и оценку популярности объекта,
+    на который ссылается новая строка
+    """
+    if created:
+        _, field, _ = COUNTERS[sender]
+        target_id = getattr(instance, f"{field}_id")
+        increment_counters(sender, [target_id])
+        if sender in TRENDING_WEIGHTS:
+            add_trending_events(sender, [(target_id, instance.created_at)])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=RecipeIngredients)
+@receiver(post_delete, sender=Subscription)
+def counted_row_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Уменьшает счетчик и оценку популярности при удалении объекта
+    и при каскадном удалении.
+    Удаления через queryset самой модели учитывает delete_counted
+    """
+    if isinstance(origin, QuerySet) and origin.model is sender:
+        return
+    counter_model, field, _ = COUNTERS[sender]
+    target_id = getattr(instance, f"{field}_id")
+    if isinstance(origin, counter_model) and origin.pk == target_id:
+        # Объект со счетчиком удаляется вместе со строкой
+        return
+    change_counters(sender, {target_id: -1})
+    if sender in TRENDING_WEIGHTS:
+        remove_trending_events(sender, [(target_id, instance.created_at)])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(instance, created, **kwargs):
+    """
+    Рассылает новый рецепт по лентам подписчиков автора
+    """
+    if created:
+        fan_out_recipes([instance])
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(instance, created, **kwargs):
+    """
+    Добавляет в ленту подписчика последние рецепты автора
+    """
+    if created:
+        add_to_feed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Убирает из ленты подписчика рецепты автора.
+    Удаления через queryset учитываются там, где они выполняются
+    """
+    if isinstance(origin, QuerySet) and origin.model is sender:
+        return
+    remove_from_feed(instance.user_id, [instance.author_id])
@@ -0,0 +1,238 @@
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from scipy import sparse
+
+from .constants import (
+    SIMILAR_RECIPES_BATCH_SIZE,
+    SIMILAR_RECIPES_CHUNK_PAIRS,
+    SIMILAR_RECIPES_COUNT,
+    SIMILAR_RECIPES_LOAD_BATCH_SIZE,
+)
+from .models import Recipe, RecipeIngredients, SimilarRecipe
+
+
+class IngredientMatrix:
+    """
+    Бинарная разреженная матрица рецепт × ингредиент.
+    Сходство рецептов - коэффициент Жаккара их наборов ингредиентов
+    """
+    def __init__(self, batch_size=SIMILAR_RECIPES_LOAD_BATCH_SIZE):
+        rows = RecipeIngredients.objects.order_by().values_list(
+            "recipe_id", "ingredient_id"
+        ).iterator(chunk_size=batch_size)
+        batches = []
+        while batch := list(islice(rows, batch_size)):
+            batches.append(np.array(batch, dtype=np.int64))
+        pairs = (
+            np.concatenate(batches) if batches
+            else np.empty((0, 2), dtype=np.int64)
+        )
+        self.recipe_ids, recipe_rows = np.unique(
+            pairs[:, 0], return_inverse=True
+        )
+        _, ingredient_columns = np.unique(pairs[:, 1], return_inverse=True)
+        self.matrix = sparse.csr_matrix(
+            (
+                np.ones(len(pairs), dtype=np.float32),
+                (recipe_rows, ingredient_columns),
+            ),
+        )
+        self.sizes = np.asarray(self.matrix.sum(axis=1)).ravel()
+        # Верхняя оценка числа рецептов с общими ингредиентами
+        self.pairs = self.matrix @ np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def get_rows(self, recipe_ids):
+        """
+        Номера строк матрицы для рецептов, у которых есть ингредиенты
+        """
+        recipe_ids = np.asarray(sorted(recipe_ids), dtype=np.int64)
+        rows = np.searchsorted(self.recipe_ids, recipe_ids)
+        rows = rows[rows < len(self.recipe_ids)]
+        return rows[np.isin(self.recipe_ids[rows], recipe_ids)]
+
+    def split(self, rows, max_pairs):
+        """
+        Делит строки на части, в каждой из которых не больше max_pairs
+        пар рецептов с общими ингредиентами, чтобы ограничить память.
+        Строка с большим числом пар образует часть сама
+        """
+        bounds = np.cumsum(self.pairs[rows])
+        start = 0
+        while start < len(rows):
+            offset = bounds[start - 1] if start else 0
+            end = max(
+                np.searchsorted(bounds, offset + max_pairs, side="right"),
+                start + 1,
+            )
+            yield rows[start:end]
+            start = end
+
+    def get_scores(self, rows):
+        """
+        Сходство рецептов из rows со всеми рецептами, у которых есть
+        общие ингредиенты: массивы (строка, столбец, сходство)
+        без пар рецепта с самим собой
+        """
+        overlap = (self.matrix[rows] @ self.matrix.T).tocoo()
+        row = np.asarray(rows)[overlap.row]
+        column = overlap.col
+        scores = overlap.data / (
+            self.sizes[row] + self.sizes[column] - overlap.data
+        )
+        other = row != column
+        return row[other], column[other], scores[other]
+
+    def get_neighbours(self, rows, count):
+        """
+        Для каждой строки из rows - count самых похожих рецептов:
+        {id рецепта: [(id похожего рецепта, сходство), ...]}
+        """
+        row, column, scores = self.get_scores(rows)
+        # По убыванию сходства внутри каждой строки,
+        # при равном сходстве - по возрастанию id
+        order = np.lexsort((column, -scores, row))
+        row, column, scores = row[order], column[order], scores[order]
+        starts = np.searchsorted(row, rows)
+        ends = np.searchsorted(row, rows, side="right")
+        return {
+            int(self.recipe_ids[current]): [
+                (int(self.recipe_ids[neighbour]), float(score))
+                for neighbour, score in zip(
+                    column[start:min(end, start + count)],
+                    scores[start:min(end, start + count)],
+                )
+            ]
+            for current, start, end in zip(rows, starts, ends)
+        }
+
+
+def save_neighbours(neighbours):
+    """
+    Заменяет списки похожих рецептов
+    """
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe__in=neighbours).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id, items in neighbours.items()
+                for similar_id, score in items
+            ),
+            batch_size=SIMILAR_RECIPES_BATCH_SIZE,
+        )
+
+
+def get_stale_recipes(computed_at):
+    """
+    id рецептов, измененных после расчета их похожих рецептов
+    """
+    return set(Recipe.objects.filter(
+        Q(similar_computed_at__isnull=True)
+        | Q(updated_at__gt=F("similar_computed_at")),
+        updated_at__lte=computed_at,
+    ).values_list("pk", flat=True))
+
+
+def build_similar_recipes(
+    computed_at,
+    full=False,
+    count=SIMILAR_RECIPES_COUNT,
+    max_pairs=SIMILAR_RECIPES_CHUNK_PAIRS,
+):
+    """
+    Пересчитывает похожие рецепты по частям, в каждой не больше
+    max_pairs пар рецептов. Без full заново считаются только рецепты,
+    измененные с прошлого запуска, и рецепты, в списках которых
+    они есть. Остальные списки дополняются измененными рецептами,
+    если те в них проходят.
+    Возвращает число рецептов с заново посчитанными списками
+    """
+    matrix = IngredientMatrix()
+    if full:
+        stale = set(Recipe.objects.filter(
+            updated_at__lte=computed_at
+        ).values_list("pk", flat=True))
+        recomputed = stale
+    else:
+        stale = get_stale_recipes(computed_at)
+        recomputed = stale | set(SimilarRecipe.objects.filter(
+            similar__in=stale
+        ).values_list("recipe", flat=True))
+
+    # У рецептов без ингредиентов похожих нет
+    empty = recomputed - set(matrix.recipe_ids.tolist())
+    for ids in batched(empty, SIMILAR_RECIPES_BATCH_SIZE):
+        SimilarRecipe.objects.filter(recipe__in=ids).delete()
+    for rows in matrix.split(matrix.get_rows(recomputed), max_pairs):
+        save_neighbours(matrix.get_neighbours(rows, count))
+    if not full:
+        for rows in matrix.split(matrix.get_rows(stale), max_pairs):
+            merge_neighbours(matrix, rows, recomputed, count)
+
+    for ids in batched(stale, SIMILAR_RECIPES_BATCH_SIZE):
+        Recipe.objects.filter(pk__in=ids).update(
+            similar_computed_at=computed_at
+        )
+    return len(recomputed)
+
+
+def merge_neighbours(matrix, rows, recomputed, count):
+    """
+    Добавляет рецепты из rows в списки остальных рецептов,
+    где их сходство выше, чем у последнего рецепта в списке
+    """
+    row, column, scores = matrix.get_scores(rows)
+    recipe_ids = matrix.recipe_ids[column]
+    similar_ids = matrix.recipe_ids[row]
+    keep = ~np.isin(recipe_ids, list(recomputed))
+    candidates = defaultdict(list)
+    for recipe_id, similar_id, score in zip(
+        recipe_ids[keep].tolist(),
+        similar_ids[keep].tolist(),
+        scores[keep].tolist(),
+    ):
+        candidates[recipe_id].append((similar_id, score))
+
+    for ids in batched(candidates, SIMILAR_RECIPES_BATCH_SIZE):
+        lists = {
+            item["recipe"]: item
+            for item in SimilarRecipe.objects.filter(
+                recipe__in=ids
+            ).values("recipe").annotate(
+                lowest=Min("score"), total=Count("pk")
+            ).order_by()
+        }
+        changed = [
+            recipe_id for recipe_id in ids
+            if recipe_id not in lists
+            or lists[recipe_id]["total"] < count
+            or max(score for _, score in candidates[recipe_id])
+            > lists[recipe_id]["lowest"]
+        ]
+        current = defaultdict(list)
+        for recipe_id, similar_id, score in SimilarRecipe.objects.filter(
+            recipe__in=changed
+        ).values_list("recipe", "similar", "score"):
+            current[recipe_id].append((similar_id, score))
+        save_neighbours({
+            recipe_id: sorted(
+                current[recipe_id] + candidates[recipe_id],
+                key=lambda item: (-item[1], item[0]),
+            )[:count]
+            for recipe_id in changed
+        })
+
+
+def batched(items, size):
+    """
+    Части по size элементов
+    """
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
@@ -0,0 +1,164 @@
+import math
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .constants import (
+    RECIPES_ORDERING_TRENDING,
+    TRENDING_BATCH_SIZE,
+    TRENDING_CUTOFF_HALF_LIVES,
+    TRENDING_EPOCH,
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE,
+    TRENDING_SCORE_PRECISION,
+    TRENDING_SHOPPING_CART_WEIGHT,
+)
+from .models import Favorite, Recipe, ShoppingCart
+
+POPULAR_ORDERING = ("-favorites_count", "-pub_date", "-id")
+TRENDING_ORDERING = ("-trending_score", "-pub_date", "-id")
+
+# Вес события для каждой модели связи с рецептом
+TRENDING_WEIGHTS = {
+    Favorite: TRENDING_FAVORITE_WEIGHT,
+    ShoppingCart: TRENDING_SHOPPING_CART_WEIGHT,
+}
+# Вклад события уменьшается вдвое за TRENDING_HALF_LIFE секунд
+TRENDING_DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE
+
+
+def get_event_score(model, moment):
+    """
+    Вклад события model в момент moment.
+    Оценка рецепта - логарифм суммы весов его событий, умноженных на
+    exp(скорость затухания × время от эпохи). Сравнивать оценки можно
+    в любой момент: затухание уменьшает все слагаемые одинаково,
+    а в логарифмической шкале оценка не переполняется со временем
+    """
+    return math.log(TRENDING_WEIGHTS[model]) + TRENDING_DECAY_RATE * (
+        moment.timestamp() - TRENDING_EPOCH
+    )
+
+
+def get_cutoff_score(moment):
+    """
+    Оценка, ниже которой вклад рецепта к моменту moment затух
+    больше чем в 2^TRENDING_CUTOFF_HALF_LIVES раз
+    """
+    return TRENDING_DECAY_RATE * (
+        moment.timestamp() - TRENDING_EPOCH
+    ) - math.log(2) * TRENDING_CUTOFF_HALF_LIVES
+
+
+def sum_scores(scores):
+    """
+    Оценка суммы событий по их оценкам: ln(Σ exp(оценка))
+    """
+    top = max(scores)
+    return top + math.log(sum(math.exp(score - top) for score in scores))
+
+
+def group_scores(model, events):
+    """
+    Суммарный вклад событий в оценку каждого рецепта:
+    {id рецепта: оценка}
+    """
+    scores = defaultdict(list)
+    for recipe_id, created_at in events:
+        scores[recipe_id].append(get_event_score(model, created_at))
+    return {pk: sum_scores(values) for pk, values in scores.items()}
+
+
+def add_trending_events(model, events):
+    """
+    Учитывает новые строки model: events - пары
+    (id рецепта, дата создания строки). Оценки всех рецептов меняются
+    одним UPDATE без чтения их прежних событий
+    """
+    scores = group_scores(model, events)
+    if not scores:
+        return
+    added = Case(
+        *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+        output_field=FloatField(),
+    )
+    # ln(exp(a) + exp(b)) = max(a, b) + ln(1 + exp(-|a - b|))
+    Recipe.objects.filter(pk__in=scores).update(trending_score=Case(
+        When(trending_score__isnull=True, then=added),
+        default=Greatest(F("trending_score"), added) + Ln(
+            1.0 + Exp(-Abs(F("trending_score") - added))
+        ),
+        output_field=FloatField(),
+    ))
+
+
+def remove_trending_events(model, events):
+    """
+    Вычитает из оценок вклад удаленных строк model:
+    events - пары (id рецепта, дата создания строки).
+    Если вклада почти не остается, оценка сбрасывается
+    """
+    scores = group_scores(model, events)
+    if not scores:
+        return
+    removed = Case(
+        *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+        output_field=FloatField(),
+    )
+    # ln(exp(a) - exp(b)) = a + ln(1 - exp(b - a))
+    Recipe.objects.filter(pk__in=scores).update(trending_score=Case(
+        When(
+            trending_score__gt=removed + TRENDING_SCORE_PRECISION,
+            then=F("trending_score") + Ln(
+                1.0 - Exp(removed - F("trending_score"))
+            ),
+        ),
+        default=None,
+        output_field=FloatField(),
+    ))
+
+
+def trim_trending_scores(moment=None):
+    """
+    Сбрасывает затухшие оценки, чтобы в индексе оставались только
+    рецепты с недавними событиями. Читает диапазон индекса
+    от младших оценок, а не всю таблицу.
+    Возвращает число сброшенных оценок
+    """
+    return Recipe.objects.filter(
+        trending_score__isnull=False,
+        trending_score__lt=get_cutoff_score(moment or timezone.now()),
+    ).update(trending_score=None)
+
+
+def rebuild_trending_scores():
+    """
+    Пересчитывает все оценки по датам создания связей.
+    Вызывается внутри транзакции
+    """
+    Recipe.objects.filter(
+        trending_score__isnull=False
+    ).update(trending_score=None)
+    for model in TRENDING_WEIGHTS:
+        events = model.objects.order_by("recipe").values_list(
+            "recipe", "created_at"
+        ).iterator(chunk_size=TRENDING_BATCH_SIZE)
+        while batch := list(islice(events, TRENDING_BATCH_SIZE)):
+            add_trending_events(model, batch)
+    trim_trending_scores()
+
+
+def order_recipes(queryset, ordering):
+    """
+    Популярные рецепты - по числу добавлений в избранное,
+    набирающие популярность - по оценке с затуханием,
+    в них попадают только рецепты с недавними событиями
+    """
+    if ordering == RECIPES_ORDERING_TRENDING:
+        return queryset.filter(
+            trending_score__isnull=False
+        ).order_by(*TRENDING_ORDERING)
+    return queryset.order_by(*POPULAR_ORDERING)
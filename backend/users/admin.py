@@ -1,6 +1,10 @@
+from collections import defaultdict
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from recipes.counters import delete_counted
+from recipes.feed import remove_from_feed
 from .models import Subscription, User
 
 
@@ -9,7 +13,15 @@ class UserAdmin(UserAdmin):
     """
     Админка для User
     """
-    list_display = ('id', 'username', 'email', 'first_name', 'last_name')
+    list_display = (
+        'id',
+        'username',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'subscribers_count',
+    )
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('id',)
 
@@ -21,3 +33,15 @@ class SubscriptionAdmin(admin.ModelAdmin):
     """
     list_display = ("id", "user", "author")
     search_fields = ("user__username", "author__username")
+
+    def delete_queryset(self, request, queryset):
+        """
+        Групповое удаление с уменьшением счетчиков авторов
+        и очисткой лент подписчиков
+        """
+        authors = defaultdict(list)
+        for user_id, author_id in queryset.values_list("user", "author"):
+            authors[user_id].append(author_id)
+        delete_counted(queryset)
+        for user_id, author_ids in authors.items():
+            remove_from_feed(user_id, author_ids)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_pull',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Рецепты читаются в ленту при запросе'),
+        ),
+    ]
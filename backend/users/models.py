@@ -47,10 +47,45 @@ class User(AbstractUser):
         upload_to=AVATAR_UPLOAD_TO,
         null=True,
         blank=True,
+        db_index=True,
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Рецептов",
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Подписчиков",
+    )
+    # Рецепты автора с большим числом подписчиков не рассылаются
+    # по лентам, а читаются при запросе ленты. Флаг не снимается
+    feed_pull = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Рецепты читаются в ленту при запросе",
+    )
+    avatar_variants_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Уменьшенные копии аватара созданы",
     )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
+    # Поля, которые save() существующего пользователя не перезаписывает:
+    # их меняют отдельными UPDATE фоновые задачи и обработчики сигналов,
+    # и значение в памяти может быть устаревшим
+    managed_fields = (
+        # Счетчики рецептов и подписчиков, меняются в recipes.counters
+        "recipes_count",
+        "subscribers_count",
+        # Режим ленты, включает рассылка рецептов в recipes.feed
+        "feed_pull",
+        # Отметка о копиях аватара, ставит фоновый пул
+        "avatar_variants_ready",
+    )
 
     class Meta:
         verbose_name = "пользователя"
@@ -62,6 +97,21 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        """
+        Поля из managed_fields меняются отдельными UPDATE,
+        поэтому при сохранении существующего пользователя
+        их значения из памяти не записываются
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.managed_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     """
@@ -85,6 +135,14 @@ class Subscription(models.Model):
         verbose_name = "подписку"
         verbose_name_plural = "подписки"
 
+        indexes = [
+            # Список подписок пользователя читает только индекс
+            models.Index(
+                fields=["user", "author"],
+                name="subscription_user_author_idx",
+            ),
+        ]
+
         constraints = [
             models.UniqueConstraint(
                 fields=["author", "user"], name="unique_subscription"